@@ -2,7 +2,7 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_socketio import SocketIO
 from flask_wtf.csrf import CSRFProtect
-from config import Config
+from config import Config, get_secret_key
 
 db = SQLAlchemy()
 socketio = SocketIO()
@@ -12,6 +12,13 @@ csrf = CSRFProtect()
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    if not app.config.get('SECRET_KEY'):
+        app.config['SECRET_KEY'] = get_secret_key()
+    
+    # Faster JSON encoding when orjson is available
+    from app.json_provider import ORJSONProvider, orjson
+    if orjson is not None:
+        app.json = ORJSONProvider(app)
     
     # CSRF protection
     app.config['WTF_CSRF_CHECK_DEFAULT'] = True
@@ -5,6 +5,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, sessio
 from datetime import datetime, timezone
 import logging
 import json
+from collections import defaultdict
 
 from app import db, socketio
 from app.models import Team, Tournament, Match, Admin, APIToken
@@ -126,8 +127,9 @@ def manage_tournaments():
             tournament.registration_open = False
             tournament.status = 'ready'
             
+            # Flush for the id; the tournament and its bracket commit together
             db.session.add(tournament)
-            db.session.commit()
+            db.session.flush()
             
             team_ids = request.form.getlist('teams')
             
@@ -144,6 +146,9 @@ def manage_tournaments():
             else:
                 create_single_elimination_bracket(tournament.id, team_ids)
             
+            # Builders commit themselves, except when they have too few teams
+            db.session.commit()
+            
             return redirect(url_for('admin.view_tournament', tournament_id=tournament.id))
     
     current_admin_id = session.get('admin_id')
@@ -160,7 +165,9 @@ def manage_tournaments():
 def view_tournament(tournament_id):
     """View tournament details."""
     tournament = db.get_or_404(Tournament, tournament_id)
-    matches = Match.query.filter_by(tournament_id=tournament_id).order_by(Match.round_number, Match.match_number).all()
+    matches = Match.query.options(
+        db.joinedload(Match.team1), db.joinedload(Match.team2)
+    ).filter_by(tournament_id=tournament_id).order_by(Match.round_number, Match.match_number).all()
     
     standings = []
     if tournament.format in ['round_robin', 'round_robin_playoffs', 'swiss']:
@@ -171,34 +178,69 @@ def view_tournament(tournament_id):
     return render_template('admin/tournament_view.html', tournament=tournament, matches=matches, standings=standings, all_teams=all_teams)
 
 
+# tournament_id -> (standings_version, standings without Team objects), least
+# recently used first
+_standings_cache = {}
+STANDINGS_CACHE_SIZE = 32
+
+
 def calculate_standings(tournament_id):
-    """Calculate team standings based on completed matches."""
-    matches = Match.query.filter_by(tournament_id=tournament_id, is_completed=True).all()
-    
-    team_stats = {}
-    
-    for match in matches:
-        if match.team1_id:
-            if match.team1_id not in team_stats:
-                team_stats[match.team1_id] = {'wins': 0, 'losses': 0, 'points_for': 0, 'points_against': 0, 'matches_played': 0, 'team': match.team1}
-            team_stats[match.team1_id]['points_for'] += match.team1_score
-            team_stats[match.team1_id]['points_against'] += match.team2_score if match.team2_id else 0
-            team_stats[match.team1_id]['matches_played'] += 1
-            if match.winner_id == match.team1_id:
-                team_stats[match.team1_id]['wins'] += 1
-            elif match.winner_id:
-                team_stats[match.team1_id]['losses'] += 1
+    """Calculate team standings, reusing the cached result until match results change."""
+    rows = _standings_rows(tournament_id)
+    
+    # Rows hold plain data only; attach this session's Team objects
+    team_ids = [entry['team_id'] for entry in rows]
+    teams = {t.id: t for t in Team.query.filter(Team.id.in_(team_ids))} if team_ids else {}
+    return [dict(entry, team=teams.get(entry['team_id'])) for entry in rows]
+
+
+def _standings_rows(tournament_id):
+    """Cached standings rows (no Team objects), recomputed when the version moves."""
+    tournament = db.session.get(Tournament, tournament_id)
+    if tournament is None:
+        _standings_cache.pop(tournament_id, None)
+        return []
+    
+    # Re-inserted on every hit so the oldest entry is the one evicted
+    cached = _standings_cache.pop(tournament_id, None)
+    if cached is None or cached[0] != tournament.standings_version:
+        cached = (tournament.standings_version, _compute_standings(tournament_id))
+    _standings_cache[tournament_id] = cached
+    while len(_standings_cache) > STANDINGS_CACHE_SIZE:
+        _standings_cache.pop(next(iter(_standings_cache)), None)
+    return cached[1]
+
+
+def _compute_standings(tournament_id):
+    """Calculate team standings from completed matches, aggregated in SQL per side."""
+    team_stats = defaultdict(lambda: {'wins': 0, 'losses': 0, 'points_for': 0, 'points_against': 0, 'matches_played': 0})
+    
+    sides = (
+        (Match.team1_id, Match.team1_score, Match.team2_id, Match.team2_score),
+        (Match.team2_id, Match.team2_score, Match.team1_id, Match.team1_score),
+    )
+    for team_col, score_col, opp_col, opp_score_col in sides:
+        rows = db.session.query(
+            team_col,
+            db.func.sum(score_col),
+            db.func.sum(db.case((opp_col.isnot(None), opp_score_col), else_=0)),
+            db.func.sum(db.case((Match.winner_id == team_col, 1), else_=0)),
+            # NULL winner compares as NULL, so undecided matches aren't losses
+            db.func.sum(db.case((Match.winner_id != team_col, 1), else_=0)),
+            db.func.count(Match.id),
+        ).filter(
+            Match.tournament_id == tournament_id,
+            Match.is_completed == True,
+            team_col.isnot(None),
+        ).group_by(team_col)
         
-        if match.team2_id:
-            if match.team2_id not in team_stats:
-                team_stats[match.team2_id] = {'wins': 0, 'losses': 0, 'points_for': 0, 'points_against': 0, 'matches_played': 0, 'team': match.team2}
-            team_stats[match.team2_id]['points_for'] += match.team2_score
-            team_stats[match.team2_id]['points_against'] += match.team1_score
-            team_stats[match.team2_id]['matches_played'] += 1
-            if match.winner_id == match.team2_id:
-                team_stats[match.team2_id]['wins'] += 1
-            elif match.winner_id:
-                team_stats[match.team2_id]['losses'] += 1
+        for team_id, points_for, points_against, wins, losses, played in rows:
+            stats = team_stats[team_id]
+            stats['points_for'] += points_for or 0
+            stats['points_against'] += points_against or 0
+            stats['wins'] += wins
+            stats['losses'] += losses
+            stats['matches_played'] += played
     
     standings = []
     for team_id, stats in team_stats.items():
@@ -222,6 +264,7 @@ def delete_tournament(tournament_id):
     Match.query.filter_by(tournament_id=tournament_id).delete()
     db.session.delete(tournament)
     db.session.commit()
+    _standings_cache.pop(tournament_id, None)
     return redirect(url_for('admin.manage_tournaments'))
 
 
@@ -234,24 +277,28 @@ def advance_to_playoffs(tournament_id):
     if tournament.format != 'round_robin_playoffs':
         return redirect(url_for('admin.view_tournament', tournament_id=tournament_id))
     
-    standings = calculate_standings(tournament_id)
+    # Only the top 4 ids are needed, so skip loading Team objects
+    top4 = [entry['team_id'] for entry in _standings_rows(tournament_id)[:4]]
     
-    if len(standings) < 4:
+    if len(top4) < 4:
         return redirect(url_for('admin.view_tournament', tournament_id=tournament_id))
     
-    semifinals = Match.query.filter_by(tournament_id=tournament_id, round_number=100).order_by(Match.match_number).all()
+    # 1st vs 4th in semifinal 1, 2nd vs 3rd in semifinal 2, in one UPDATE
+    result = db.session.execute(
+        db.update(Match)
+        .where(Match.tournament_id == tournament_id, Match.round_number == 100, Match.match_number.in_((1, 2)))
+        .values(
+            team1_id=db.case({1: top4[0], 2: top4[1]}, value=Match.match_number),
+            team2_id=db.case({1: top4[3], 2: top4[2]}, value=Match.match_number),
+            is_current=db.case((Match.match_number == 1, True), else_=Match.is_current),
+        )
+    )
     
-    if len(semifinals) >= 2:
-        semifinals[0].team1_id = standings[0]['team_id']
-        semifinals[0].team2_id = standings[3]['team_id']
-        
-        semifinals[1].team1_id = standings[1]['team_id']
-        semifinals[1].team2_id = standings[2]['team_id']
-        
+    if result.rowcount >= 2:
         tournament.current_phase = 'playoffs'
-        semifinals[0].is_current = True
-        
         db.session.commit()
+    else:
+        db.session.rollback()
     
     return redirect(url_for('admin.view_tournament', tournament_id=tournament_id))
 
@@ -312,7 +359,7 @@ def edit_match(match_id):
         'match_id': match.id,
         'team1_score': match.team1_score,
         'team2_score': match.team2_score
-    })
+    }, to=f'tournament_{match.tournament_id}')
     
     flash(f"Match {match.match_number} updated successfully", "success")
     return redirect(url_for('admin.view_tournament', tournament_id=match.tournament_id))
@@ -521,10 +568,10 @@ def admin_start_tournament(tournament_id):
             'error': f'Need at least {tournament.min_teams or 2} confirmed teams to start'
         }), 400
     
+    # Not committed yet; the status change and the bracket commit together
     tournament.registration_open = False
     tournament.status = 'in_progress'
     tournament.current_phase = 'bracket'
-    db.session.commit()
     
     format_type = tournament.format or 'single_elimination'
     
@@ -541,6 +588,9 @@ def admin_start_tournament(tournament_id):
     else:
         create_single_elimination_bracket(tournament_id, team_ids)
     
+    # Builders commit themselves, except when they have too few teams
+    db.session.commit()
+    
     socketio.emit('tournament_started', {
         'tournament_id': tournament_id,
         'team_count': len(teams)
@@ -3,22 +3,103 @@ API blueprint - REST API routes for matches, display, TV, and registration.
 """
 from flask import Blueprint, request, jsonify, session, url_for
 from datetime import datetime, timezone, timedelta
+from itertools import chain
+from sqlalchemy import event
+from sqlalchemy.orm import Session, aliased
 import logging
+import threading
 
 from app import db, socketio
 from app.models import Match, Tournament, Team, DisplayState, TVSession
-from app.utils import sanitize_text, generate_theme_css, THEMES
-from app.utils import sanitize_text, generate_theme_css, THEMES
-from app.blueprints.auth import login_required, api_login_required, admin_or_tv_required
+from app.utils import sanitize_text, sanitize_message, theme_css_etag, THEMES
+from app.blueprints.auth import login_required, api_login_required, admin_or_tv_required, get_paired_codes, set_paired_codes, set_session_value
 
 logger = logging.getLogger(__name__)
 
 api = Blueprint('api', __name__)
 
 
+# TV heartbeats are buffered here (code -> last seen) and written in batches,
+# so polling TVs don't commit on every request. Request threads record while a
+# flush runs, so the buffer is only touched under the lock and a flush swaps in
+# a fresh dict rather than iterating the live one
+HEARTBEAT_FLUSH_INTERVAL = timedelta(seconds=15)
+_heartbeat_buffer = {}
+_heartbeat_lock = threading.Lock()
+_last_heartbeat_flush = datetime.now(timezone.utc)
+
+
+def record_heartbeat(code):
+    """Buffer a TV heartbeat, flushing the buffer once the interval has passed."""
+    global _last_heartbeat_flush
+    now = datetime.now(timezone.utc)
+    with _heartbeat_lock:
+        _heartbeat_buffer[code] = now
+        flush_due = now - _last_heartbeat_flush >= HEARTBEAT_FLUSH_INTERVAL
+        if flush_due:
+            _last_heartbeat_flush = now
+    if flush_due:
+        flush_heartbeats()
+    return now
+
+
+def flush_heartbeats():
+    """Write each buffered TV's own last heartbeat time with one executemany UPDATE."""
+    global _heartbeat_buffer
+    with _heartbeat_lock:
+        buffered, _heartbeat_buffer = _heartbeat_buffer, {}
+    if not buffered:
+        return
+    seen = [{'b_code': code, 'b_last_seen': last_seen} for code, last_seen in buffered.items()]
+    tv_sessions = TVSession.__table__
+    db.session.execute(
+        db.update(tv_sessions)
+        .where(tv_sessions.c.code == db.bindparam('b_code'))
+        .values(last_seen=db.bindparam('b_last_seen')),
+        seen
+    )
+    db.session.commit()
+
+
+# The DisplayState singleton changes rarely but is polled by every TV; keep its
+# to_dict() here and drop it when a commit writes the row
+_display_state_cache = {}
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_display_state_write(session, flush_context):
+    if any(isinstance(obj, DisplayState) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info['display_state_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _drop_display_state_cache(session):
+    if session.info.pop('display_state_changed', False):
+        _display_state_cache.clear()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_display_state_write(session):
+    session.info.pop('display_state_changed', None)
+
+
+def cached_display_state():
+    """The display state as a dict, read from the DB only after it changes."""
+    if 'state' not in _display_state_cache:
+        _display_state_cache['state'] = get_or_create_display_state().to_dict()
+    return dict(_display_state_cache['state'])
+
+
+def theme_css_url(theme_id):
+    """Versioned URL of a theme's stylesheet, falling back to the default theme."""
+    if theme_id not in THEMES:
+        theme_id = 'dark-orange'
+    return url_for('main.theme_stylesheet', theme_id=theme_id, v=theme_css_etag(theme_id)[:12])
+
+
 def get_or_create_display_state():
     """Get or create the singleton display state."""
-    state = DisplayState.query.first()
+    state = DisplayState.query.options(db.joinedload(DisplayState.tournament)).first()
     if not state:
         state = DisplayState(mode='waiting')
         db.session.add(state)
@@ -50,11 +131,12 @@ def update_score(match_id):
     
     db.session.commit()
     
-    socketio.emit('score_update', {
+    # Fan out in the background so the response doesn't wait on the emit
+    socketio.start_background_task(socketio.emit, 'score_update', {
         'match_id': match_id,
         'team1_score': match.team1_score,
         'team2_score': match.team2_score
-    })
+    }, to=f'tournament_{match.tournament_id}')
     
     return jsonify(match.to_dict())
 
@@ -84,7 +166,7 @@ def swap_teams(match_id):
         'team1_score': match.team1_score,
         'team2_score': match.team2_score,
         'swap': True
-    })
+    }, to=f'tournament_{match.tournament_id}')
     
     return jsonify(match.to_dict())
 
@@ -119,18 +201,24 @@ def complete_match(match_id):
     if next_current:
         next_current.is_current = True
     
-    db.session.commit()
-    
     # Update display state
     state = get_or_create_display_state()
     state.mode = 'waiting'
     db.session.commit()
     
+    # One IN query for every team in the payloads; match.to_dict() then
+    # resolves its relationships from the identity map
+    team_ids = {match.winner_id, match.team1_id, match.team2_id}
+    if next_current:
+        team_ids |= {next_current.team1_id, next_current.team2_id}
+    team_ids.discard(None)
+    teams = {t.id: t for t in Team.query.filter(Team.id.in_(team_ids))} if team_ids else {}
+    
     # Prepare response data
     next_match_data = None
     if next_current:
-        team1 = db.session.get(Team, next_current.team1_id) if next_current.team1_id else None
-        team2 = db.session.get(Team, next_current.team2_id) if next_current.team2_id else None
+        team1 = teams.get(next_current.team1_id)
+        team2 = teams.get(next_current.team2_id)
         next_match_data = {
             'match_id': next_current.id,
             'round': next_current.round_number,
@@ -138,10 +226,11 @@ def complete_match(match_id):
             'team2': team2.to_dict() if team2 else None
         }
     
-    winner_team = db.session.get(Team, winner_id) if winner_id else None
+    winner_team = teams.get(match.winner_id)
     winner_data = winner_team.to_dict() if winner_team else None
     
-    socketio.emit('match_complete', {
+    # Payloads are plain dicts by now, so the background emit never touches the session
+    socketio.start_background_task(socketio.emit, 'match_complete', {
         'match_id': match_id,
         'winner_id': winner_id,
         'winner': winner_data,
@@ -158,8 +247,13 @@ def set_current_match(match_id):
     """Set a match as the current match."""
     match = db.get_or_404(Match, match_id)
     
-    Match.query.filter_by(tournament_id=match.tournament_id, is_current=True).update({'is_current': False})
-    match.is_current = True
+    # One UPDATE flips the old current match(es) off and this one on
+    db.session.execute(
+        db.update(Match)
+        .where(Match.tournament_id == match.tournament_id,
+               db.or_(Match.is_current == True, Match.id == match_id))
+        .values(is_current=db.case((Match.id == match_id, True), else_=False))
+    )
     db.session.commit()
     
     socketio.emit('current_match_changed', {'match_id': match_id})
@@ -171,8 +265,23 @@ def set_current_match(match_id):
 @admin_or_tv_required
 def get_bracket(tournament_id):
     """Get tournament bracket."""
-    matches = Match.query.filter_by(tournament_id=tournament_id).order_by(Match.round_number, Match.match_number).all()
-    return jsonify([m.to_dict() for m in matches])
+    rows = Match.bracket_rows(tournament_id)
+    team_ids = {row[key] for row in rows for key in ('team1_id', 'team2_id', 'winner_id')} - {None}
+    teams = {t.id: t.to_dict() for t in Team.query.filter(Team.id.in_(team_ids))} if team_ids else {}
+    
+    # Same shape as Match.to_dict()
+    return jsonify([{
+        'id': row['id'],
+        'round_number': row['round_number'],
+        'match_number': row['match_number'],
+        'team1': teams.get(row['team1_id']),
+        'team2': teams.get(row['team2_id']),
+        'team1_score': row['team1_score'],
+        'team2_score': row['team2_score'],
+        'winner': teams.get(row['winner_id']),
+        'is_current': row['is_current'],
+        'is_completed': row['is_completed']
+    } for row in rows])
 
 
 @api.route('/tournament/<int:tournament_id>/next-match', methods=['GET'])
@@ -181,51 +290,48 @@ def get_next_match(tournament_id):
     """Get the next upcoming match, prioritizing team continuity."""
     db.get_or_404(Tournament, tournament_id)
     
-    # 1. Find all playable matches
-    playable_matches = Match.query.filter(
-        Match.tournament_id == tournament_id,
-        Match.is_completed == False,
-        Match.is_current == False,
-        Match.team1_id.isnot(None),
-        Match.team2_id.isnot(None)
-    ).order_by(Match.round_number, Match.match_number).all()
-    
-    if not playable_matches:
+    # Teams "on the field" are the ones from the last completed match
+    last_completed = (
+        db.select(Match.team1_id, Match.team2_id)
+        .filter_by(tournament_id=tournament_id, is_completed=True)
+        .order_by(Match.id.desc())
+        .limit(1)
+        .subquery()
+    )
+    match_teams = (Match.team1_id, Match.team2_id)
+    has_continuity = db.exists().where(db.or_(
+        last_completed.c.team1_id.in_(match_teams),
+        last_completed.c.team2_id.in_(match_teams)
+    ))
+    
+    # One query: the first playable match, continuity first, joined to both teams
+    team1 = aliased(Team, name='team1')
+    team2 = aliased(Team, name='team2')
+    next_match = db.session.execute(
+        db.select(Match.id, Match.round_number, Match.match_number,
+                  has_continuity.label('is_continuity'), team1, team2)
+        .join(team1, Match.team1_id == team1.id)
+        .join(team2, Match.team2_id == team2.id)
+        .where(
+            Match.tournament_id == tournament_id,
+            Match.is_completed == False,
+            Match.is_current == False
+        )
+        .order_by(has_continuity.desc(), Match.round_number, Match.match_number)
+        .limit(1)
+    ).first()
+    
+    if not next_match:
         return jsonify({'next_match': None})
-        
-    # 2. Identify teams currently "on the field" (from last completed match)
-    last_completed = Match.query.filter_by(
-        tournament_id=tournament_id, 
-        is_completed=True
-    ).order_by(Match.id.desc()).first()
-    
-    teams_on_field = set()
-    if last_completed:
-        if last_completed.team1_id: teams_on_field.add(last_completed.team1_id)
-        if last_completed.team2_id: teams_on_field.add(last_completed.team2_id)
-    
-    # 3. Sort matches: Priority to those containing a team on the field
-    # We use python's sort which is stable. 
-    # Primary key: 0 if has team on field, 1 if not (so continuity comes first)
-    # Secondary key: round number (already sorted by query)
-    # Tertiary key: match number (already sorted by query)
-    
-    def priority_sort_key(match):
-        has_continuity = (match.team1_id in teams_on_field) or (match.team2_id in teams_on_field)
-        return 0 if has_continuity else 1
-        
-    playable_matches.sort(key=priority_sort_key)
-    
-    next_match = playable_matches[0]
     
     return jsonify({
         'next_match': {
             'id': next_match.id,
             'round_number': next_match.round_number,
             'match_number': next_match.match_number,
-            'team1': next_match.team1.to_dict() if next_match.team1 else None,
-            'team2': next_match.team2.to_dict() if next_match.team2 else None,
-            'is_continuity': (priority_sort_key(next_match) == 0)
+            'team1': next_match.team1.to_dict(),
+            'team2': next_match.team2.to_dict(),
+            'is_continuity': bool(next_match.is_continuity)
         }
     })
 
@@ -236,16 +342,22 @@ def get_tournament_stats(tournament_id):
     """Get tournament statistics."""
     db.get_or_404(Tournament, tournament_id)
     
-    total_matches = Match.query.filter_by(tournament_id=tournament_id).count()
-    completed_matches = Match.query.filter_by(tournament_id=tournament_id, is_completed=True).count()
-    current_match = Match.query.filter_by(tournament_id=tournament_id, is_current=True).first()
+    # All counts in one aggregate query instead of three round-trips
+    row = db.session.execute(
+        db.select(
+            db.func.count().label('total'),
+            db.func.count().filter(Match.is_completed == True).label('completed'),
+            db.func.count().filter(Match.is_current == True).label('current'),
+            db.func.max(db.case((Match.is_current == True, Match.round_number))).label('current_round')
+        ).where(Match.tournament_id == tournament_id)
+    ).one()
     
     return jsonify({
-        'total': total_matches,
-        'completed': completed_matches,
-        'remaining': total_matches - completed_matches,
-        'has_current_match': current_match is not None,
-        'current_round': current_match.round_number if current_match else None
+        'total': row.total,
+        'completed': row.completed,
+        'remaining': row.total - row.completed,
+        'has_current_match': row.current > 0,
+        'current_round': row.current_round
     })
 
 
@@ -280,20 +392,24 @@ def api_get_tournament_teams(tournament_id):
 @api.route('/display/state', methods=['GET'])
 def get_display_state():
     """Get current display state."""
-    state = get_or_create_display_state()
-    result = state.to_dict()
+    result = cached_display_state()
+    mode = result['mode']
+    tournament_id = result['tournament_id']
     
-    if state.tournament_id:
-        tournament = db.session.get(Tournament, state.tournament_id)
+    if tournament_id:
+        tournament = db.session.get(Tournament, tournament_id)
         if tournament:
             result['tournament'] = tournament.to_dict()
-            current_match = Match.query.filter_by(tournament_id=state.tournament_id, is_current=True).first()
+            # Teams come back in the same SELECT; to_dict() and the payloads below reuse them
+            current_match = Match.query.options(
+                db.joinedload(Match.team1), db.joinedload(Match.team2), db.joinedload(Match.winner)
+            ).filter_by(tournament_id=tournament_id, is_current=True).first()
             if current_match:
                 result['current_match'] = current_match.to_dict()
                 
-                if state.mode == 'waiting':
-                    team1 = db.session.get(Team, current_match.team1_id) if current_match.team1_id else None
-                    team2 = db.session.get(Team, current_match.team2_id) if current_match.team2_id else None
+                if mode == 'waiting':
+                    team1 = current_match.team1
+                    team2 = current_match.team2
                     result['next_match'] = {
                         'match_id': current_match.id,
                         'round': current_match.round_number,
@@ -301,9 +417,11 @@ def get_display_state():
                         'team2': team2.to_dict() if team2 else None
                     }
                 
-                if state.mode == 'scoreboard':
-                    next_upcoming = Match.query.filter(
-                        Match.tournament_id == state.tournament_id,
+                if mode == 'scoreboard':
+                    next_upcoming = Match.query.options(
+                        db.joinedload(Match.team1), db.joinedload(Match.team2)
+                    ).filter(
+                        Match.tournament_id == tournament_id,
                         Match.is_completed == False,
                         Match.is_current == False,
                         Match.team1_id.isnot(None),
@@ -319,12 +437,12 @@ def get_display_state():
                             'is_finals': next_upcoming.next_match_id is None
                         }
     
-    if hasattr(state, 'winner_team_id') and state.winner_team_id:
-        winner = db.session.get(Team, state.winner_team_id)
+    if result.get('winner_team_id'):
+        winner = db.session.get(Team, result['winner_team_id'])
         if winner:
             result['winner_team'] = winner.to_dict()
     
-    result['theme_css'] = generate_theme_css(result.get('theme', 'dark-orange'))
+    result['theme_css_url'] = theme_css_url(result.get('theme'))
     
     return jsonify(result)
 
@@ -379,7 +497,7 @@ def set_display_theme():
     
     socketio.emit('theme_change', {
         'theme': theme_id,
-        'theme_css': generate_theme_css(theme_id)
+        'theme_css_url': theme_css_url(theme_id)
     })
     
     return jsonify({'success': True, 'theme': theme_id})
@@ -410,11 +528,10 @@ def pair_tv_api():
     
     tv_session = TVSession.query.filter_by(code=code, is_active=True).first()
     if tv_session:
-        tv_codes = session.get('tv_codes', [])
+        tv_codes = get_paired_codes()
         if code not in tv_codes:
-            tv_codes.append(code)
-        session['tv_codes'] = tv_codes
-        session['tv_code'] = code
+            set_paired_codes(tv_codes + [code])
+        set_session_value('tv_code', code)
         
         socketio.emit('controller_connected', {
             'code': tv_session.code,
@@ -434,19 +551,18 @@ def pair_all_tvs_api():
     if not tv_sessions:
         return jsonify({'success': False, 'error': 'No active TVs found'}), 404
     
-    paired_codes = []
-    for tv_session in tv_sessions:
-        paired_codes.append(tv_session.code)
-        
-        socketio.emit('controller_connected', {
-            'code': tv_session.code,
-            'admin': session.get('admin_username', 'Unknown'),
-            'control_all': True
-        }, room=f'tv_{tv_session.code}')
+    paired_codes = [tv_session.code for tv_session in tv_sessions]
+    
+    # One emit to every TV room - the packet is encoded once for all TVs
+    socketio.emit('controller_connected', {
+        'codes': paired_codes,
+        'admin': session.get('admin_username', 'Unknown'),
+        'control_all': True
+    }, room=[f'tv_{code}' for code in paired_codes])
     
-    session['tv_codes'] = paired_codes
-    session['tv_code'] = paired_codes[0] if paired_codes else None
-    session['control_all_tvs'] = True
+    set_paired_codes(paired_codes)
+    set_session_value('tv_code', paired_codes[0] if paired_codes else None)
+    set_session_value('control_all_tvs', True)
     
     return jsonify({
         'success': True, 
@@ -459,17 +575,20 @@ def pair_all_tvs_api():
 @login_required
 def unpair_tv_api():
     """Unpair from all TVs."""
-    old_codes = session.pop('tv_codes', [])
-    old_code = session.pop('tv_code', None)
-    session.pop('control_all_tvs', None)
+    old_codes = get_paired_codes()
+    old_code = session.get('tv_code')
+    # Only touch keys that are set, so an already-unpaired session isn't re-sent
+    for key in ('tv_codes', 'tv_code', 'control_all_tvs'):
+        if key in session:
+            session.pop(key)
     
     if old_code and old_code not in old_codes:
         old_codes.append(old_code)
     
-    for code in old_codes:
+    if old_codes:
         socketio.emit('controller_disconnected', {
-            'code': code
-        }, room=f'tv_{code}')
+            'codes': old_codes
+        }, room=[f'tv_{code}' for code in old_codes])
     
     return jsonify({'success': True})
 
@@ -484,14 +603,22 @@ def validate_tv_codes():
     if not codes:
         return jsonify({'active': [], 'inactive': []})
     
-    stale_threshold = datetime.utcnow() - timedelta(minutes=2)
+    stale_threshold = datetime.now(timezone.utc) - timedelta(minutes=2)
+    
+    tv_sessions = TVSession.query.filter(
+        TVSession.code.in_([code.upper() for code in codes]),
+        TVSession.is_active == True
+    ).all()
+    by_code = {tv.code: tv for tv in tv_sessions}
     
     active = []
     inactive = []
     
     for code in codes:
-        tv = TVSession.query.filter_by(code=code.upper(), is_active=True).first()
-        if tv and tv.last_seen and tv.last_seen > stale_threshold:
+        tv = by_code.get(code.upper())
+        # Unflushed heartbeats are newer than the stored value
+        last_seen = _heartbeat_buffer.get(code.upper()) or (tv.last_seen if tv else None)
+        if tv and last_seen and last_seen > stale_threshold:
             active.append(code)
         else:
             inactive.append(code)
@@ -516,9 +643,8 @@ def get_tv_state(code):
     """Get TV state."""
     tv_session = TVSession.query.filter_by(code=code.upper(), is_active=True).first()
     if tv_session:
-        tv_session.last_seen = datetime.now(timezone.utc)
-        db.session.commit()
-        return jsonify(tv_session.to_dict())
+        last_seen = record_heartbeat(tv_session.code)
+        return jsonify(dict(tv_session.to_dict(), last_seen=last_seen.isoformat()))
     return jsonify({'error': 'Not found'}), 404
 
 
@@ -527,9 +653,8 @@ def tv_heartbeat(code):
     """TV heartbeat to stay active."""
     tv_session = TVSession.query.filter_by(code=code.upper(), is_active=True).first()
     if tv_session:
-        tv_session.last_seen = datetime.utcnow()
-        db.session.commit()
-        return jsonify({'success': True, 'last_seen': tv_session.last_seen.isoformat()})
+        last_seen = record_heartbeat(tv_session.code)
+        return jsonify({'success': True, 'last_seen': last_seen.isoformat()})
     return jsonify({'error': 'TV not found'}), 404
 
 
@@ -554,21 +679,22 @@ def control_tv(code):
     
     db.session.commit()
     
+    # One frame carries both the control state and any redirect
+    redirect_url = None
     if data.get('redirect_to_live') and tv_session.tournament_id:
-        live_url = url_for('display.display_live', tournament_id=tv_session.tournament_id)
-        socketio.emit('redirect_to_live', {
-            'code': tv_session.code,
-            'url': live_url,
-            'tournament_id': tv_session.tournament_id
-        }, room=f'tv_{tv_session.code}')
+        redirect_url = url_for('display.display_live', tournament_id=tv_session.tournament_id)
     
-    socketio.emit('tv_control', {
+    payload = {
         'code': tv_session.code,
         'mode': tv_session.mode,
         'custom_message': tv_session.custom_message,
         'winner_team_id': tv_session.winner_team_id,
-        'tournament_id': tv_session.tournament_id
-    }, room=f'tv_{tv_session.code}')
+        'tournament_id': tv_session.tournament_id,
+        'redirect_url': redirect_url
+    }
+    # Unset fields are left out of the frame; the TV pages treat missing and null alike
+    socketio.emit('tv_control', {k: v for k, v in payload.items() if v is not None},
+                  room=f'tv_{tv_session.code}')
     
     return jsonify({'success': True, 'tv_session': tv_session.to_dict()})
 
@@ -697,18 +823,19 @@ def test_generate_brackets():
             db.session.commit()
             
             try:
-                # Create teams
-                team_ids = []
-                for i in range(count):
-                    team = Team(
-                        name=f'T{i+1}', 
-                        player1=f'P{i+1}a', 
-                        player2=f'P{i+1}b', 
-                        tournament_id=t.id
-                    )
-                    db.session.add(team)
-                    db.session.commit()
-                    team_ids.append(team.id)
+                # Create teams with one bulk INSERT, ids returned in row order
+                team_ids = db.session.execute(
+                    db.insert(Team).returning(Team.id, sort_by_parameter_order=True),
+                    [
+                        {
+                            'name': f'T{i+1}',
+                            'player1': f'P{i+1}a',
+                            'player2': f'P{i+1}b',
+                            'tournament_id': t.id
+                        }
+                        for i in range(count)
+                    ]
+                ).scalars().all()
                 
                 # Generate bracket
                 fmt_func(t.id, team_ids)
@@ -1,10 +1,12 @@
 """
 Authentication blueprint - handles login, logout, TV pairing, and auth decorators.
 """
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
-from functools import wraps
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, current_app
+from functools import wraps, lru_cache
 from urllib.parse import urlparse
+from werkzeug.security import generate_password_hash, check_password_hash
 import logging
+import secrets
 
 from app import db, socketio
 from app.models import Admin, TVSession
@@ -26,6 +28,12 @@ def login_required(f):
     return decorated_function
 
 
+@lru_cache(maxsize=1)
+def _dummy_password_hash(method):
+    """Hash checked against on unknown usernames, so a miss costs as much as a wrong password."""
+    return generate_password_hash(secrets.token_hex(16), method)
+
+
 def get_current_admin():
     """Get the currently logged-in admin user."""
     if 'admin_id' in session:
@@ -33,6 +41,25 @@ def get_current_admin():
     return None
 
 
+def set_session_value(key, value):
+    """Store a session value only when it changes, so the cookie isn't re-signed and re-sent."""
+    if session.get(key) != value:
+        session[key] = value
+
+
+def get_paired_codes():
+    """TV codes this browser controls, kept in the cookie as one comma-separated string."""
+    codes = session.get('tv_codes')
+    if isinstance(codes, list):  # Cookies written before the string format
+        return codes
+    return codes.split(',') if codes else []
+
+
+def set_paired_codes(codes):
+    """Store the paired TV codes, leaving the cookie alone if they didn't change."""
+    set_session_value('tv_codes', ','.join(codes))
+
+
 def api_login_required(f):
     """Decorator for API endpoints that return JSON error instead of redirect."""
     @wraps(f)
@@ -86,7 +113,12 @@ def login():
         password = request.form.get('password')
         
         admin_user = Admin.query.filter_by(username=username, is_active=True).first()
-        if admin_user and admin_user.check_password(password):
+        if admin_user:
+            password_ok = admin_user.check_password(password or '')
+        else:
+            check_password_hash(_dummy_password_hash(current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt')), password or '')
+            password_ok = False
+        if password_ok:
             session['admin_id'] = admin_user.id
             session['admin_username'] = admin_user.username
             next_page = request.args.get('next')
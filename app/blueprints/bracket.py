@@ -3,13 +3,20 @@ Bracket generation functions for different tournament formats.
 """
 import math
 import random
-from itertools import combinations
 
 from app import db
-from app.models import Match
+from app.models import Match, bump_standings_version
 
+# Private generator so bracket shuffles don't share the module-global one
+_rng = random.Random()
 
-def create_single_elimination_bracket(tournament_id, team_ids):
+
+def _shuffler(seed):
+    """Generator for one bracket build; a seed makes the draw reproducible."""
+    return random.Random(seed) if seed is not None else _rng
+
+
+def create_single_elimination_bracket(tournament_id, team_ids, seed=None):
     """Create elimination bracket for the tournament with bye support for uneven teams."""
     num_teams = len(team_ids)
     if num_teams < 2:
@@ -17,15 +24,16 @@ def create_single_elimination_bracket(tournament_id, team_ids):
     
     # Convert to list of ints and shuffle
     team_ids = [int(t) for t in team_ids]
-    random.shuffle(team_ids)
+    _shuffler(seed).shuffle(team_ids)
     
     # Calculate bracket size (next power of 2)
     num_rounds = math.ceil(math.log2(num_teams))
     bracket_size = 2 ** num_rounds
     num_byes = bracket_size - num_teams
     
-    # Create all match slots first
+    # Create all match slots first, indexed by round
     all_matches = []
+    by_round = {}
     for round_num in range(1, num_rounds + 1):
         matches_in_round = bracket_size // (2 ** round_num)
         for match_num in range(1, matches_in_round + 1):
@@ -34,26 +42,25 @@ def create_single_elimination_bracket(tournament_id, team_ids):
                 round_number=round_num,
                 match_number=match_num
             )
-            db.session.add(match)
             all_matches.append(match)
+            by_round.setdefault(round_num, []).append(match)
     
-    db.session.commit()
+    # Flushed as one batched INSERT; ids are needed to link next_match_id
+    db.session.add_all(all_matches)
+    db.session.flush()
     
     # Link matches to next round
     for round_num in range(1, num_rounds):
-        current_round = [m for m in all_matches if m.round_number == round_num]
-        next_round = [m for m in all_matches if m.round_number == round_num + 1]
+        current_round = by_round.get(round_num, [])
+        next_round = by_round.get(round_num + 1, [])
         
         for i, match in enumerate(current_round):
             next_match_idx = i // 2
             if next_match_idx < len(next_round):
                 match.next_match_id = next_round[next_match_idx].id
     
-    db.session.commit()
-    
     # Get first round matches
-    first_round = [m for m in all_matches if m.round_number == 1]
-    first_round.sort(key=lambda m: m.match_number)
+    first_round = by_round.get(1, [])
     
     # Pad team list with None for byes
     padded_teams = team_ids + [None] * num_byes
@@ -93,8 +100,6 @@ def create_single_elimination_bracket(tournament_id, team_ids):
         elif not match.team1_id and not match.team2_id:
             match.is_completed = True
     
-    db.session.commit()
-    
     # Set first playable match as current
     for match in all_matches:
         if not match.is_completed and match.team1_id and match.team2_id:
@@ -104,14 +109,14 @@ def create_single_elimination_bracket(tournament_id, team_ids):
     db.session.commit()
 
 
-def create_double_elimination_bracket(tournament_id, team_ids):
+def create_double_elimination_bracket(tournament_id, team_ids, seed=None):
     """Create double elimination bracket - winners and losers brackets."""
     num_teams = len(team_ids)
     if num_teams < 2:
         return
     
     team_ids = list(team_ids)
-    random.shuffle(team_ids)
+    _shuffler(seed).shuffle(team_ids)
     
     # Calculate rounds for winners bracket
     num_rounds = math.ceil(math.log2(num_teams))
@@ -123,14 +128,12 @@ def create_double_elimination_bracket(tournament_id, team_ids):
     for round_num in range(1, num_rounds + 1):
         matches_in_round = total_slots // (2 ** round_num)
         for match_num in range(1, matches_in_round + 1):
-            match = Match(
+            matches.append(Match(
                 tournament_id=tournament_id,
                 round_number=round_num,
                 match_number=match_num,
                 match_type='bracket'
-            )
-            db.session.add(match)
-            matches.append(match)
+            ))
     
     # Create losers bracket matches
     losers_rounds = (num_rounds - 1) * 2
@@ -142,30 +145,30 @@ def create_double_elimination_bracket(tournament_id, team_ids):
             matches_in_round = max(1, total_slots // (2 ** (round_num // 2 + 1)))
         
         for match_num in range(1, matches_in_round + 1):
-            match = Match(
+            matches.append(Match(
                 tournament_id=tournament_id,
                 round_number=100 + round_num,
                 match_number=losers_match_num,
                 match_type='losers_bracket'
-            )
-            db.session.add(match)
-            matches.append(match)
+            ))
             losers_match_num += 1
     
     # Grand finals
-    grand_finals = Match(
+    matches.append(Match(
         tournament_id=tournament_id,
         round_number=200,
         match_number=1,
         match_type='finals'
-    )
-    db.session.add(grand_finals)
-    matches.append(grand_finals)
+    ))
     
-    db.session.commit()
+    db.session.add_all(matches)
+    
+    by_round = {}
+    for m in matches:
+        by_round.setdefault((m.round_number, m.match_type), []).append(m)
     
     # Assign teams to first round
-    first_round = [m for m in matches if m.round_number == 1]
+    first_round = by_round.get((1, 'bracket'), [])
     bye_teams = team_ids[:num_byes]
     playing_teams = team_ids[num_byes:]
     
@@ -178,7 +181,7 @@ def create_double_elimination_bracket(tournament_id, team_ids):
                 first_round[match_idx].team2_id = int(team_id)
     
     # Handle byes
-    second_round = [m for m in matches if m.round_number == 2 and m.match_type == 'bracket']
+    second_round = by_round.get((2, 'bracket'), [])
     for i, team_id in enumerate(bye_teams):
         if i < len(second_round):
             if second_round[i].team1_id is None:
@@ -195,171 +198,159 @@ def create_double_elimination_bracket(tournament_id, team_ids):
     db.session.commit()
 
 
-def create_round_robin(tournament_id, team_ids):
+def round_robin_schedule(team_ids):
+    """Schedule every pairing with the circle method.
+    
+    Returns (round, match_number, team1_id, team2_id) tuples. Every team plays
+    at most once per round; with an odd team count one team sits out each round.
+    """
+    teams = list(team_ids)
+    if len(teams) % 2:
+        teams.append(None)  # BYE
+    n = len(teams)
+    
+    def at(round_num, position):
+        # Team 0 stays fixed; the rest rotate one place per round
+        if position == 0:
+            return teams[0]
+        return teams[1 + (position - round_num) % (n - 1)]
+    
+    schedule = []
+    for round_num in range(1, n):
+        pairs = [(at(round_num, i), at(round_num, n - 1 - i)) for i in range(n // 2)]
+        if round_num % 2 == 0:
+            # Alternate sides so the fixed team isn't always team 1
+            pairs[0] = pairs[0][::-1]
+        schedule.extend(
+            (round_num, match_num, team1_id, team2_id)
+            for match_num, (team1_id, team2_id) in enumerate(
+                (pair for pair in pairs if None not in pair), start=1)
+        )
+    
+    return schedule
+
+
+def create_round_robin(tournament_id, team_ids, seed=None):
     """Create round robin - every team plays every other team."""
     num_teams = len(team_ids)
     if num_teams < 2:
         return
     
     team_ids = list(team_ids)
-    random.shuffle(team_ids)
-    
-    # Generate all possible pairings
-    all_pairings = list(combinations(team_ids, 2))
-    random.shuffle(all_pairings)
-    
-    # Create matches
-    matches_per_round = max(1, num_teams // 2)
-    round_num = 1
-    match_num = 1
-    
-    for i, (team1_id, team2_id) in enumerate(all_pairings):
-        match = Match(
-            tournament_id=tournament_id,
-            round_number=round_num,
-            match_number=match_num,
-            team1_id=int(team1_id),
-            team2_id=int(team2_id),
-            match_type='group',
-            group_name='Round Robin'
-        )
-        db.session.add(match)
-        
-        match_num += 1
-        if match_num > matches_per_round:
-            match_num = 1
-            round_num += 1
+    _shuffler(seed).shuffle(team_ids)
+    
+    # Schedule every pairing, one game per team per round; the first match
+    # starts as current
+    rows = [{
+        'tournament_id': tournament_id,
+        'round_number': round_num,
+        'match_number': match_num,
+        'team1_id': int(team1_id),
+        'team2_id': int(team2_id),
+        'match_type': 'group',
+        'group_name': 'Round Robin',
+        'is_current': index == 0
+    } for index, (round_num, match_num, team1_id, team2_id) in enumerate(round_robin_schedule(team_ids))]
+    
+    # Bulk INSERT - skips building a Match object per pairing
+    db.session.execute(db.insert(Match), rows)
     
     db.session.commit()
-    
-    # Set first match as current
-    first_match = Match.query.filter_by(tournament_id=tournament_id).order_by(Match.round_number, Match.match_number).first()
-    if first_match:
-        first_match.is_current = True
-        db.session.commit()
 
 
-def create_round_robin_playoffs(tournament_id, team_ids):
+def create_round_robin_playoffs(tournament_id, team_ids, seed=None):
     """Create round robin group stage followed by top 4 playoffs."""
     num_teams = len(team_ids)
     if num_teams < 2:
         return
     
     team_ids = list(team_ids)
-    random.shuffle(team_ids)
-    
-    # Create round robin group stage matches
-    all_pairings = list(combinations(team_ids, 2))
-    random.shuffle(all_pairings)
-    
-    matches_per_round = max(1, num_teams // 2)
-    round_num = 1
-    match_num = 1
-    
-    for i, (team1_id, team2_id) in enumerate(all_pairings):
-        match = Match(
-            tournament_id=tournament_id,
-            round_number=round_num,
-            match_number=match_num,
-            team1_id=int(team1_id),
-            team2_id=int(team2_id),
-            match_type='group',
-            group_name='Group Stage'
-        )
-        db.session.add(match)
-        
-        match_num += 1
-        if match_num > matches_per_round:
-            match_num = 1
-            round_num += 1
+    _shuffler(seed).shuffle(team_ids)
     
-    # Create playoff bracket (4 teams - semifinals and finals)
+    # Playoff bracket (4 teams - semifinals and finals). The finals go in
+    # first with RETURNING so the semis can be inserted already linked to it.
     playoff_round = 100
-    
-    semi1 = Match(
-        tournament_id=tournament_id,
-        round_number=playoff_round,
-        match_number=1,
-        match_type='bracket',
-        group_name='Semifinal 1'
-    )
-    db.session.add(semi1)
-    
-    semi2 = Match(
-        tournament_id=tournament_id,
-        round_number=playoff_round,
-        match_number=2,
-        match_type='bracket',
-        group_name='Semifinal 2'
-    )
-    db.session.add(semi2)
-    
-    db.session.commit()
-    
-    finals = Match(
-        tournament_id=tournament_id,
-        round_number=playoff_round + 1,
-        match_number=1,
-        match_type='finals',
-        group_name='Finals'
-    )
-    db.session.add(finals)
-    
-    semi1.next_match_id = finals.id
-    semi2.next_match_id = finals.id
+    finals_id = db.session.execute(
+        db.insert(Match).returning(Match.id),
+        {
+            'tournament_id': tournament_id,
+            'round_number': playoff_round + 1,
+            'match_number': 1,
+            'match_type': 'finals',
+            'group_name': 'Finals'
+        }
+    ).scalar_one()
+    
+    # Round robin group stage, one game per team per round; the first group
+    # match starts as current
+    rows = [{
+        'tournament_id': tournament_id,
+        'round_number': round_num,
+        'match_number': match_num,
+        'team1_id': int(team1_id),
+        'team2_id': int(team2_id),
+        'match_type': 'group',
+        'group_name': 'Group Stage',
+        'is_current': index == 0,
+        'next_match_id': None
+    } for index, (round_num, match_num, team1_id, team2_id) in enumerate(round_robin_schedule(team_ids))]
+    
+    rows += [{
+        'tournament_id': tournament_id,
+        'round_number': playoff_round,
+        'match_number': match_num,
+        'team1_id': None,
+        'team2_id': None,
+        'match_type': 'bracket',
+        'group_name': f'Semifinal {match_num}',
+        'is_current': False,
+        'next_match_id': finals_id
+    } for match_num in (1, 2)]
+    
+    # Group stage and semis in one bulk INSERT
+    db.session.execute(db.insert(Match), rows)
     
     db.session.commit()
-    
-    # Set first group match as current
-    first_match = Match.query.filter_by(tournament_id=tournament_id, match_type='group').order_by(Match.round_number, Match.match_number).first()
-    if first_match:
-        first_match.is_current = True
-        db.session.commit()
 
 
-def create_swiss_round(tournament_id, team_ids, round_num=1):
+def create_swiss_round(tournament_id, team_ids, round_num=1, seed=None):
     """Create a Swiss system round - pair teams with similar records."""
     num_teams = len(team_ids)
     if num_teams < 2:
         return
     
     team_ids = list(team_ids)
-    random.shuffle(team_ids)
+    _shuffler(seed).shuffle(team_ids)
     
     # For first round, just pair randomly
-    match_num = 1
-    for i in range(0, len(team_ids) - 1, 2):
-        match = Match(
-            tournament_id=tournament_id,
-            round_number=round_num,
-            match_number=match_num,
-            team1_id=int(team_ids[i]),
-            team2_id=int(team_ids[i + 1]) if i + 1 < len(team_ids) else None,
-            match_type='group',
-            group_name=f'Swiss Round {round_num}'
-        )
-        db.session.add(match)
-        match_num += 1
+    rows = [{
+        'tournament_id': tournament_id,
+        'round_number': round_num,
+        'match_number': match_num,
+        'team1_id': int(team_ids[i]),
+        'team2_id': int(team_ids[i + 1]),
+        'match_type': 'group',
+        'group_name': f'Swiss Round {round_num}',
+        'is_current': match_num == 1
+    } for match_num, i in enumerate(range(0, num_teams - 1, 2), start=1)]
     
     # If odd number of teams, last team gets a bye
     if num_teams % 2 == 1:
-        bye_match = Match(
-            tournament_id=tournament_id,
-            round_number=round_num,
-            match_number=match_num,
-            team1_id=int(team_ids[-1]),
-            team2_id=None,
-            match_type='group',
-            group_name=f'Swiss Round {round_num} (Bye)',
-            is_completed=True,
-            winner_id=int(team_ids[-1])
-        )
-        db.session.add(bye_match)
+        rows.append({
+            'tournament_id': tournament_id,
+            'round_number': round_num,
+            'match_number': len(rows) + 1,
+            'team1_id': int(team_ids[-1]),
+            'team2_id': None,
+            'match_type': 'group',
+            'group_name': f'Swiss Round {round_num} (Bye)',
+            'is_completed': True,
+            'winner_id': int(team_ids[-1])
+        })
+    
+    # Bulk INSERT; it bypasses mapper events, so bump standings for the bye by hand
+    db.session.execute(db.insert(Match), rows)
+    if num_teams % 2 == 1:
+        bump_standings_version(db.session.connection(), tournament_id)
     
     db.session.commit()
-    
-    # Set first match as current
-    first_match = Match.query.filter_by(tournament_id=tournament_id, round_number=round_num).order_by(Match.match_number).first()
-    if first_match and first_match.team1_id and first_match.team2_id:
-        first_match.is_current = True
-        db.session.commit()
@@ -1,10 +1,11 @@
 """
 Display blueprint - TV display routes.
 """
-from flask import Blueprint, render_template, request, session, url_for
+from flask import Blueprint, current_app, render_template, session, url_for
+from functools import lru_cache
+from markupsafe import Markup
 import qrcode
-import io
-import base64
+import qrcode.image.svg
 
 from app import db
 from app.models import Tournament, Match, Team, TVSession
@@ -12,6 +13,43 @@ from app.models import Tournament, Match, Team, TVSession
 display = Blueprint('display', __name__)
 
 
+class QRCodeImage(qrcode.image.svg.SvgPathImage):
+    """Single-path SVG QR code in the display colours."""
+    background = '#14141f'
+    QR_PATH_STYLE = dict(qrcode.image.svg.SvgPathImage.QR_PATH_STYLE, fill='#ff6b00')
+
+
+@lru_cache(maxsize=512)
+def qr_svg(data):
+    """Render a pairing QR code as inline SVG markup, cached per encoded URL."""
+    qr = qrcode.QRCode(version=1, box_size=10, border=2, image_factory=QRCodeImage)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return Markup(qr.make_image().to_string(encoding='unicode'))
+
+
+def pair_url(code):
+    """Absolute pairing URL for a TV code, built on PUBLIC_URL when it is configured."""
+    base_url = current_app.config.get('PUBLIC_URL')
+    if base_url:
+        return base_url.rstrip('/') + url_for('auth.pair_tv', code=code)
+    return url_for('auth.pair_tv', code=code, _external=True)
+
+
+def new_tv_session(**kwargs):
+    """Create a TV session and remember it in this display's cookie."""
+    tv_session = TVSession(code=TVSession.generate_code(), **kwargs)
+    db.session.add(tv_session)
+    db.session.commit()
+    session['tv_session_id'] = tv_session.id
+    return tv_session
+
+
+def tv_pairing_qr(tv_session):
+    """Pairing QR for a TV; keyed by its pair URL, so a new PUBLIC_URL or host renders afresh."""
+    return qr_svg(pair_url(tv_session.code))
+
+
 @display.route('/')
 def display_index():
     """TV display landing page - shows QR code for pairing."""
@@ -27,27 +65,13 @@ def display_index():
     
     if not tv_session:
         # Create new TV session
-        tv_session = TVSession(code=TVSession.generate_code())
-        db.session.add(tv_session)
-        db.session.commit()
-        session['tv_session_id'] = tv_session.id
-    
-    # Generate QR code
-    pair_url = request.url_root.rstrip('/') + url_for('auth.pair_tv', code=tv_session.code)
-    
-    qr = qrcode.QRCode(version=1, box_size=10, border=2)
-    qr.add_data(pair_url)
-    qr.make(fit=True)
-    qr_img = qr.make_image(fill_color="#ff6b00", back_color="#14141f")
+        tv_session = new_tv_session()
     
-    buffer = io.BytesIO()
-    qr_img.save(buffer, format='PNG')
-    qr_base64 = base64.b64encode(buffer.getvalue()).decode()
+    qr_code = tv_pairing_qr(tv_session)
     
     return render_template('display/index.html', 
                           tv_session=tv_session,
-                          qr_code=qr_base64,
-                          pair_url=pair_url)
+                          qr_code=qr_code)
 
 
 @display.route('/tournament/<int:tournament_id>')
@@ -63,8 +87,14 @@ def display_tournament(tournament_id):
 def display_bracket(tournament_id):
     """Dedicated bracket display - optimized for TV screens."""
     tournament = db.get_or_404(Tournament, tournament_id)
-    matches = Match.query.filter_by(tournament_id=tournament_id).order_by(Match.round_number, Match.match_number).all()
-    teams = Team.query.join(Match, (Match.team1_id == Team.id) | (Match.team2_id == Team.id)).filter(Match.tournament_id == tournament_id).distinct().all()
+    rows = Match.bracket_rows(tournament_id)
+    # Team ids come from the rows already loaded, so no OR-join against match
+    team_ids = {row[key] for row in rows for key in ('team1_id', 'team2_id')} - {None}
+    teams = Team.query.filter(Team.id.in_(team_ids)).all() if team_ids else []
+    teams_by_id = {t.id: t for t in teams}
+    # Plain rows plus their teams; the template reads both the same as Match attributes
+    matches = [dict(row, team1=teams_by_id.get(row['team1_id']), team2=teams_by_id.get(row['team2_id']))
+               for row in rows]
     return render_template('display/bracket.html', tournament=tournament, matches=matches, teams=teams)
 
 
@@ -89,32 +119,15 @@ def display_live(tournament_id):
         tv_session = TVSession.query.filter_by(id=tv_session_id, is_active=True).first()
     
     if not tv_session:
-        tv_session = TVSession(
-            code=TVSession.generate_code(),
-            tournament_id=tournament_id,
-            mode='waiting'
-        )
-        db.session.add(tv_session)
-        db.session.commit()
-        session['tv_session_id'] = tv_session.id
+        tv_session = new_tv_session(tournament_id=tournament_id, mode='waiting')
     else:
         if tv_session.tournament_id != tournament_id:
             tv_session.tournament_id = tournament_id
             db.session.commit()
     
-    # Generate QR code
-    pair_url = url_for('auth.pair_tv', code=tv_session.code, _external=True)
-    qr = qrcode.QRCode(version=1, box_size=10, border=2)
-    qr.add_data(pair_url)
-    qr.make(fit=True)
-    qr_img = qr.make_image(fill_color="#ff6b00", back_color="#14141f")
-    
-    buffered = io.BytesIO()
-    qr_img.save(buffered, format="PNG")
-    qr_base64 = base64.b64encode(buffered.getvalue()).decode()
+    qr_code = tv_pairing_qr(tv_session)
     
     return render_template('display/live.html', 
                          tournament=tournament, 
                          tv_session=tv_session,
-                         qr_code=qr_base64,
-                         pair_url=pair_url)
+                         qr_code=qr_code)
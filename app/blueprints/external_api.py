@@ -163,7 +163,7 @@ def update_match_score(match_id):
         'team1_score': match.team1_score,
         'team2_score': match.team2_score,
         'source': 'external_api'
-    })
+    }, to=f'tournament_{match.tournament_id}')
     
     logger.info(f"External API score update: match={match_id}, score={match.team1_score}-{match.team2_score}")
     
@@ -207,7 +207,7 @@ def add_point(match_id):
         'team1_score': match.team1_score,
         'team2_score': match.team2_score,
         'source': 'external_api'
-    })
+    }, to=f'tournament_{match.tournament_id}')
     
     logger.info(f"External API add-point: match={match_id}, team={team}, score={match.team1_score}-{match.team2_score}")
     
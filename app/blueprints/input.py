@@ -3,8 +3,9 @@ Input blueprint - iPad controller routes.
 """
 from flask import Blueprint, render_template, session
 
+from app import db
 from app.models import Tournament, Match, Team, TVSession
-from app.blueprints.auth import login_required
+from app.blueprints.auth import login_required, get_paired_codes
 
 input_bp = Blueprint('input', __name__)
 
@@ -16,7 +17,7 @@ def input_index():
     tournaments = Tournament.query.filter_by(is_active=True).all()
     tv_sessions = TVSession.query.filter_by(is_active=True).all()
     current_tv_code = session.get('tv_code')
-    tv_codes = session.get('tv_codes', [])
+    tv_codes = get_paired_codes()
     control_all = session.get('control_all_tvs', False)
     return render_template('input/index.html', 
                           tournaments=tournaments, 
@@ -1,12 +1,53 @@
 """
-Main blueprint - handles the index/landing page.
+Main blueprint - handles the index/landing page and theme stylesheets.
 """
-from flask import Blueprint, render_template
+from flask import Blueprint, abort, current_app, render_template, request
+from functools import lru_cache
+import gzip
+
+from app.utils import THEMES, generate_theme_css, theme_css_etag
+
+try:
+    import brotli
+except ImportError:  # Optional - gzip is always offered
+    brotli = None
 
 main = Blueprint('main', __name__)
 
 
+@lru_cache(maxsize=16)
+def compressed_theme_css(theme_id):
+    """Theme CSS compressed once at maximum level, keyed by content encoding."""
+    css = generate_theme_css(theme_id).encode()
+    bodies = {'gzip': gzip.compress(css, 9)}
+    if brotli is not None:
+        bodies['br'] = brotli.compress(css, quality=11)
+    return bodies
+
+
 @main.route('/')
 def index():
     """Landing page."""
     return render_template('index.html')
+
+
+@main.route('/theme/<theme_id>.css')
+def theme_stylesheet(theme_id):
+    """Theme CSS. Links carry the content hash, so browsers may keep it forever."""
+    if theme_id not in THEMES:
+        abort(404)
+    
+    bodies = compressed_theme_css(theme_id)
+    encoding = request.accept_encodings.best_match(list(bodies))
+    if encoding:
+        response = current_app.response_class(bodies[encoding], mimetype='text/css')
+        response.content_encoding = encoding
+        response.set_etag(f'{theme_css_etag(theme_id)}-{encoding}')
+    else:
+        response = current_app.response_class(generate_theme_css(theme_id), mimetype='text/css')
+        response.set_etag(theme_css_etag(theme_id))
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
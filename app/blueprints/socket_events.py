@@ -1,17 +1,23 @@
 """
 Socket.IO event handlers.
 """
-from datetime import datetime
 import logging
+import time
 
 from flask_socketio import emit, join_room, leave_room
 
 from app import db, socketio
-from app.models import Match, TVSession
+from app.models import Match, TVSession, sql_utc_now
 from app.blueprints.auth import socket_login_required
 
 logger = logging.getLogger(__name__)
 
+# Reconnecting TVs rejoin often; only write last_seen once per interval per
+# code. Only codes of active displays are tracked, least recently written first
+JOIN_TV_WRITE_INTERVAL = 30
+JOIN_TV_TRACKED_MAX = 256
+_last_seen_written = {}
+
 
 @socketio.on('connect')
 def handle_connect():
@@ -32,10 +38,20 @@ def handle_join_tv(data):
     if code:
         join_room(f'tv_{code}')
         print(f'TV {code} joined room')
-        tv_session = TVSession.query.filter_by(code=code, is_active=True).first()
-        if tv_session:
-            tv_session.last_seen = datetime.utcnow()
+        now = time.monotonic()
+        if now - _last_seen_written.get(code, float('-inf')) >= JOIN_TV_WRITE_INTERVAL:
+            result = db.session.execute(
+                db.update(TVSession)
+                .where(TVSession.code == code, TVSession.is_active == True)
+                .values(last_seen=sql_utc_now())
+            )
             db.session.commit()
+            # Unknown codes come from unauthenticated clients; don't remember them
+            if result.rowcount:
+                _last_seen_written.pop(code, None)
+                _last_seen_written[code] = now
+                while len(_last_seen_written) > JOIN_TV_TRACKED_MAX:
+                    _last_seen_written.pop(next(iter(_last_seen_written)), None)
 
 
 @socketio.on('leave_tv')
@@ -75,17 +91,25 @@ def handle_score_update(data):
             match.team2_score = data['team2_score']
         db.session.commit()
         
-        socketio.emit('score_update', {
+        # Only clients following this tournament care about its scores; emit
+        # in the background so the handler returns straight after the commit
+        socketio.start_background_task(socketio.emit, 'score_update', {
             'match_id': match_id,
             'team1_score': match.team1_score,
             'team2_score': match.team2_score
-        })
+        }, to=f'tournament_{match.tournament_id}')
 
 
 @socketio.on('winner_pending')
 @socket_login_required
 def handle_winner_pending(data):
     """Handle when match time ends and there's a pending winner to confirm."""
+    tournament_id = data.get('tournament_id')
+    if tournament_id is None:
+        match = db.session.get(Match, data['match_id'])
+        if not match:
+            return
+        tournament_id = match.tournament_id
     socketio.emit('winner_pending', {
         'match_id': data['match_id'],
         'team1_score': data['team1_score'],
@@ -93,7 +117,7 @@ def handle_winner_pending(data):
         'winner_id': data['winner_id'],
         'winner_name': data['winner_name'],
         'is_overtime': data.get('is_overtime', False)
-    })
+    }, to=f'tournament_{tournament_id}')
 
 
 @socketio.on('tv_command')
@@ -0,0 +1,40 @@
+"""
+JSON provider backed by orjson, used for API responses when orjson is installed.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional speedup - stdlib json is used without it
+    orjson = None
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Drop-in for Flask's default provider that encodes with orjson.
+
+    Datetimes are passed through to Flask's default() so responses keep the
+    same format as stdlib encoding.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Custom stdlib options (indent, cls, ...) - let json handle them
+            return super().dumps(obj, **kwargs)
+        return self._encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encode(obj) + b'\n', mimetype=self.mimetype)
+
+    def _encode(self, obj):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self._app.debug:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
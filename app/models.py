@@ -1,6 +1,12 @@
 from app import db
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
+import hashlib
 import secrets
 import string
 
@@ -10,17 +16,55 @@ def utc_now():
     return datetime.now(timezone.utc)
 
 
+def isoformat(value):
+    """Serialize an optional datetime for to_dict()"""
+    return value.isoformat() if value else None
+
+
+class UTCDateTime(TypeDecorator):
+    """DateTime stored as naive UTC and always loaded back timezone-aware (UTC)"""
+    impl = db.DateTime
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
+
+class sql_utc_now(FunctionElement):
+    """Current UTC time computed by the database, for UTCDateTime columns"""
+    type = UTCDateTime()
+    inherit_cache = True
+
+
+@compiles(sql_utc_now)
+def _compile_utc_now(element, compiler, **kw):
+    # SQLite's CURRENT_TIMESTAMP is already UTC
+    return 'CURRENT_TIMESTAMP'
+
+
+@compiles(sql_utc_now, 'postgresql')
+def _compile_utc_now_pg(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
 class Admin(db.Model):
     """Admin users who can control the tournament"""
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(256), nullable=True)  # Werkzeug hash (longer)
-    created_at = db.Column(db.DateTime, default=utc_now)
+    created_at = db.Column(UTCDateTime, default=utc_now)
     is_active = db.Column(db.Boolean, default=True)
     
     def set_password(self, password):
         """Hash and store password using werkzeug's secure hashing"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt'))
     
     def check_password(self, password):
         """Verify password against stored hash"""
@@ -33,7 +77,7 @@ class Admin(db.Model):
             'id': self.id,
             'username': self.username,
             'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': isoformat(self.created_at)
         }
 
 
@@ -43,8 +87,8 @@ class TVSession(db.Model):
     code = db.Column(db.String(6), unique=True, nullable=False)  # 6-char pairing code
     tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'), nullable=True)
     socket_id = db.Column(db.String(100), nullable=True)  # Socket.IO session ID
-    created_at = db.Column(db.DateTime, default=utc_now)
-    last_seen = db.Column(db.DateTime, default=utc_now)
+    created_at = db.Column(UTCDateTime, default=utc_now)
+    last_seen = db.Column(UTCDateTime, default=utc_now)
     is_active = db.Column(db.Boolean, default=True)
     
     # Display state for this specific TV
@@ -75,7 +119,7 @@ class TVSession(db.Model):
             'tournament_name': self.tournament.name if self.tournament else None,
             'mode': self.mode,
             'is_active': self.is_active,
-            'last_seen': self.last_seen.isoformat() if self.last_seen else None
+            'last_seen': isoformat(self.last_seen)
         }
 
 
@@ -92,7 +136,7 @@ class Team(db.Model):
     # Registration metadata
     email = db.Column(db.String(100), nullable=True)  # Contact email (for future notifications)
     phone = db.Column(db.String(20), nullable=True)  # Contact phone (optional)
-    registered_at = db.Column(db.DateTime, default=utc_now)
+    registered_at = db.Column(UTCDateTime, default=utc_now)
     registration_ip = db.Column(db.String(45), nullable=True)  # For abuse prevention
     
     # Status
@@ -101,14 +145,19 @@ class Team(db.Model):
     seed = db.Column(db.Integer, nullable=True)  # Seeding for brackets
     
     # For legacy/global teams (nullable tournament_id)
-    created_at = db.Column(db.DateTime, default=utc_now)
+    created_at = db.Column(UTCDateTime, default=utc_now)
     
     # Relationships
-    tournament = db.relationship('Tournament', backref='registered_teams', foreign_keys=[tournament_id])
+    # selectin: loading tournaments also batch-loads their teams in one IN query,
+    # so per-tournament team counts (e.g. the tournament list) don't hit the DB
+    tournament = db.relationship('Tournament', backref=db.backref('registered_teams', lazy='selectin'),
+                                 foreign_keys=[tournament_id])
     
     # Unique constraint: team name must be unique within a tournament
+    # The lower(name) index serves the case-insensitive duplicate-name checks
     __table_args__ = (
         db.UniqueConstraint('name', 'tournament_id', name='unique_team_per_tournament'),
+        db.Index('ix_team_tournament_name_lower', 'tournament_id', db.func.lower(name)),
     )
     
     def to_dict(self):
@@ -121,7 +170,7 @@ class Team(db.Model):
             'is_confirmed': self.is_confirmed,
             'is_checked_in': self.is_checked_in,
             'seed': self.seed,
-            'registered_at': self.registered_at.isoformat() if self.registered_at else None
+            'registered_at': isoformat(self.registered_at)
         }
 
 
@@ -130,7 +179,7 @@ class Tournament(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)  # Tournament description
-    created_at = db.Column(db.DateTime, default=utc_now)
+    created_at = db.Column(UTCDateTime, default=utc_now)
     
     # Owner (admin who created this tournament)
     owner_id = db.Column(db.Integer, db.ForeignKey('admin.id'), nullable=True)
@@ -139,7 +188,7 @@ class Tournament(db.Model):
     # Registration settings
     registration_code = db.Column(db.String(20), nullable=True)  # 6-char code or custom password
     registration_open = db.Column(db.Boolean, default=True)  # Is registration currently open
-    registration_deadline = db.Column(db.DateTime, nullable=True)  # Auto-close registration
+    registration_deadline = db.Column(UTCDateTime, nullable=True)  # Auto-close registration
     max_teams = db.Column(db.Integer, default=16, nullable=True)  # Maximum number of teams (optional)
     min_teams = db.Column(db.Integer, default=4, nullable=True)  # Minimum to start (optional)
     require_confirmation = db.Column(db.Boolean, default=False)  # Admin must confirm teams
@@ -152,9 +201,10 @@ class Tournament(db.Model):
     timer_duration = db.Column(db.Integer, default=150)  # Default 2:30 (150 seconds)
     format = db.Column(db.String(50), default='single_elimination')
     current_phase = db.Column(db.String(50), default='registration')
+    standings_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # Bumped when match results change
     
     # Event details (for future features)
-    event_date = db.Column(db.DateTime, nullable=True)
+    event_date = db.Column(UTCDateTime, nullable=True)
     location = db.Column(db.String(200), nullable=True)
     
     # Matches relationship
@@ -172,11 +222,11 @@ class Tournament(db.Model):
     
     def get_registered_team_count(self):
         """Get count of registered teams"""
-        return Team.query.filter_by(tournament_id=self.id).count()
+        return len(self.registered_teams)
     
     def get_confirmed_team_count(self):
         """Get count of confirmed teams"""
-        return Team.query.filter_by(tournament_id=self.id, is_confirmed=True).count()
+        return sum(1 for team in self.registered_teams if team.is_confirmed)
     
     def can_register(self):
         """Check if registration is still possible"""
@@ -207,9 +257,9 @@ class Tournament(db.Model):
             'confirmed_teams': self.get_confirmed_team_count(),
             'require_confirmation': self.require_confirmation,
             'require_email': self.require_email,
-            'event_date': self.event_date.isoformat() if self.event_date else None,
+            'event_date': isoformat(self.event_date),
             'location': self.location,
-            'created_at': self.created_at.isoformat()
+            'created_at': isoformat(self.created_at)
         }
     
     def to_public_dict(self):
@@ -225,7 +275,7 @@ class Tournament(db.Model):
             'registered_teams': self.get_registered_team_count(),
             'spots_remaining': max(0, self.max_teams - self.get_registered_team_count()),
             'require_email': self.require_email,
-            'event_date': self.event_date.isoformat() if self.event_date else None,
+            'event_date': isoformat(self.event_date),
             'location': self.location
         }
 
@@ -250,6 +300,27 @@ class Match(db.Model):
     team2 = db.relationship('Team', foreign_keys=[team2_id])
     winner = db.relationship('Team', foreign_keys=[winner_id])
     
+    # Covering indexes for the per-side standings aggregates, the round/match
+    # ordering used by every bracket and tournament view, and current/open match
+    # lookups (also covers the stats aggregate)
+    __table_args__ = (
+        db.Index('ix_match_standings_team1', 'tournament_id', 'is_completed', 'team1_id'),
+        db.Index('ix_match_standings_team2', 'tournament_id', 'is_completed', 'team2_id'),
+        db.Index('ix_match_tournament_round_match', 'tournament_id', 'round_number', 'match_number'),
+        db.Index('ix_match_tournament_state_order', 'tournament_id', 'is_current', 'is_completed',
+                 'round_number', 'match_number'),
+    )
+    
+    @classmethod
+    def bracket_rows(cls, tournament_id):
+        """Column-only rows for a tournament's matches, without ORM instances"""
+        return db.session.execute(
+            db.select(cls.id, cls.round_number, cls.match_number, cls.team1_id, cls.team2_id,
+                      cls.team1_score, cls.team2_score, cls.winner_id, cls.is_current, cls.is_completed)
+            .filter_by(tournament_id=tournament_id)
+            .order_by(cls.round_number, cls.match_number)
+        ).mappings().all()
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -265,6 +336,34 @@ class Match(db.Model):
         }
 
 
+# Match columns that feed into tournament standings
+STANDINGS_FIELDS = ('team1_id', 'team2_id', 'team1_score', 'team2_score', 'winner_id', 'is_completed')
+
+
+def bump_standings_version(connection, tournament_id):
+    """Invalidate cached standings; call directly after bulk writes, which skip mapper events"""
+    tournaments = Tournament.__table__
+    connection.execute(
+        tournaments.update()
+        .where(tournaments.c.id == tournament_id)
+        .values(standings_version=tournaments.c.standings_version + 1)
+    )
+
+
+@event.listens_for(Match, 'after_update')
+def _match_updated(mapper, connection, target):
+    state = db.inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in STANDINGS_FIELDS):
+        bump_standings_version(connection, target.tournament_id)
+
+
+@event.listens_for(Match, 'after_insert')
+@event.listens_for(Match, 'after_delete')
+def _match_inserted_or_deleted(mapper, connection, target):
+    if target.is_completed:
+        bump_standings_version(connection, target.tournament_id)
+
+
 class DisplayState(db.Model):
     """Global display state for TV displays (legacy, use TVSession instead)"""
     id = db.Column(db.Integer, primary_key=True)
@@ -273,7 +372,7 @@ class DisplayState(db.Model):
     match_id = db.Column(db.Integer, db.ForeignKey('match.id'), nullable=True)
     custom_message = db.Column(db.String(500), nullable=True)
     show_players = db.Column(db.Boolean, default=True)
-    updated_at = db.Column(db.DateTime, default=utc_now, onupdate=utc_now)
+    updated_at = db.Column(UTCDateTime, default=utc_now, onupdate=utc_now)
     
     tournament = db.relationship('Tournament', foreign_keys=[tournament_id])
     match = db.relationship('Match', foreign_keys=[match_id])
@@ -291,17 +390,17 @@ class DisplayState(db.Model):
 class APIToken(db.Model):
     """API tokens for external system integration"""
     id = db.Column(db.Integer, primary_key=True)
-    token_hash = db.Column(db.String(128), unique=True, nullable=False)  # SHA256 hash
+    token_hash = db.Column(db.String(128), unique=True, nullable=False)  # Hex digest (see hash_token)
     token_prefix = db.Column(db.String(8), nullable=False)  # First 8 chars for identification
     name = db.Column(db.String(80), nullable=False)  # "Robot Controller", "Scoring System"
     admin_id = db.Column(db.Integer, db.ForeignKey('admin.id'), nullable=False)
     tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'), nullable=True)  # Optional scope
     permissions = db.Column(db.String(500), default='[]')  # JSON array of permissions
     is_active = db.Column(db.Boolean, default=True)
-    last_used = db.Column(db.DateTime, nullable=True)
+    last_used = db.Column(UTCDateTime, nullable=True)
     request_count = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=utc_now)
-    expires_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(UTCDateTime, default=utc_now)
+    expires_at = db.Column(UTCDateTime, nullable=True)
     
     admin = db.relationship('Admin', backref=db.backref('api_tokens', lazy='dynamic'))
     tournament = db.relationship('Tournament', foreign_keys=[tournament_id])
@@ -325,9 +424,16 @@ class APIToken(db.Model):
     
     @staticmethod
     def hash_token(token):
-        """Hash a token for secure storage"""
-        import hashlib
-        return hashlib.sha256(token.encode()).hexdigest()
+        """Hash a token for secure storage.
+        
+        Keyed BLAKE2b when TOKEN_PEPPER is configured, plain SHA-256 otherwise.
+        Never keyed with SECRET_KEY, which may be regenerated on restart.
+        """
+        pepper = current_app.config.get('TOKEN_PEPPER')
+        if not pepper:
+            return hashlib.sha256(token.encode()).hexdigest()
+        key = pepper.encode()[:hashlib.blake2b.MAX_KEY_SIZE]
+        return hashlib.blake2b(token.encode(), key=key, digest_size=32).hexdigest()
     
     @classmethod
     def create_token(cls, name, admin_id, permissions=None, tournament_id=None, expires_at=None):
@@ -394,8 +500,8 @@ class APIToken(db.Model):
             'tournament_name': self.tournament.name if self.tournament else None,
             'permissions': self.get_permissions(),
             'is_active': self.is_active,
-            'last_used': self.last_used.isoformat() if self.last_used else None,
+            'last_used': isoformat(self.last_used),
             'request_count': self.request_count,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+            'created_at': isoformat(self.created_at),
+            'expires_at': isoformat(self.expires_at)
         }
\ No newline at end of file
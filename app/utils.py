@@ -1,9 +1,46 @@
 """
 Utility functions for the RobotUprising Tournament app
 """
+import hashlib
 import re
-import html
-from markupsafe import Markup, escape
+from functools import lru_cache
+from markupsafe import escape
+
+# Built once at import; the sanitizers run on every form/API write.
+# Control characters (except tab/newline/CR) are deleted with str.translate.
+_CONTROL_CHARS_DELETE = dict.fromkeys([*range(0x00, 0x09), 0x0b, 0x0c, *range(0x0e, 0x20), 0x7f])
+# The entities markupsafe.escape produces, for building fused translate tables
+_HTML_ESCAPE_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&#34;', "'": '&#39;'})
+# Inputs with none of these characters come out of escaping unchanged
+_HTML_META_CHARS = frozenset('&<>"\'')
+_UNSAFE_TEXT_CHARS = _HTML_META_CHARS | frozenset(map(chr, _CONTROL_CHARS_DELETE))
+_TEAM_NAME_DISALLOWED_RE = re.compile(r'[^\w\s\-_.\'&!]')
+_PLAYER_NAME_DISALLOWED_RE = re.compile(r'[^\w\s\-_.]')
+# ASCII team names filter and escape in one translate: disallowed characters
+# map to None, the allowed HTML-meta ones (& and ') to their entities
+_TEAM_NAME_ASCII_TABLE = {
+    c: None if _TEAM_NAME_DISALLOWED_RE.match(chr(c)) else _HTML_ESCAPE_TABLE[c]
+    for c in range(128)
+    if _TEAM_NAME_DISALLOWED_RE.match(chr(c)) or c in _HTML_ESCAPE_TABLE
+}
+# Player names allow no HTML-meta characters, so for ASCII input deleting the
+# disallowed ones is the whole filter-and-escape step
+_PLAYER_NAME_ASCII_DELETE = dict.fromkeys(c for c in range(128) if _PLAYER_NAME_DISALLOWED_RE.match(chr(c)))
+
+_LEADING_SPACE_RE = re.compile(r'\s*')
+_NON_SPACE_RE = re.compile(r'\S')
+
+
+def _clip(text, max_length):
+    """text.strip()[:max_length] without stripping a copy of overly long input."""
+    if len(text) <= 2 * max_length:
+        return text.strip()[:max_length]
+    start = _LEADING_SPACE_RE.match(text).end()
+    end = start + max_length
+    # Trailing whitespace only matters if nothing but whitespace follows the cut
+    if _NON_SPACE_RE.search(text, end):
+        return text[start:end]
+    return text[start:end].rstrip()
 
 
 def sanitize_text(text, max_length=100):
@@ -19,18 +56,18 @@ def sanitize_text(text, max_length=100):
     # Convert to string
     text = str(text)
     
-    # Strip leading/trailing whitespace
-    text = text.strip()
+    # Strip leading/trailing whitespace and limit length
+    text = _clip(text, max_length) if max_length else text.strip()
     
-    # Limit length
-    if max_length:
-        text = text[:max_length]
+    # Most input is plain text with nothing to strip or escape
+    if _UNSAFE_TEXT_CHARS.isdisjoint(text):
+        return text
     
     # Remove null bytes and other control characters (except newline/tab)
-    text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]', '', text)
+    text = text.translate(_CONTROL_CHARS_DELETE)
     
     # HTML escape to prevent XSS
-    text = html.escape(text, quote=True)
+    text = str(escape(text))
     
     return text
 
@@ -40,17 +77,25 @@ def sanitize_team_name(name):
     if name is None:
         return ""
     
-    name = str(name).strip()[:8]  # Max 8 characters for team names
+    name = _clip(str(name), 8)  # Max 8 characters for team names
+    
+    # Empty or plain ASCII alphanumeric names pass every filter unchanged
+    if not name or (name.isascii() and name.isalnum()):
+        return name
+    
+    if name.isascii():
+        # Filter and escape in a single pass, then collapse whitespace runs
+        return ' '.join(name.translate(_TEAM_NAME_ASCII_TABLE).split())
     
     # Allow only safe characters for team names
     # Alphanumeric, spaces, hyphens, underscores, dots, apostrophes
-    name = re.sub(r'[^\w\s\-_.\'&!]', '', name, flags=re.UNICODE)
+    name = _TEAM_NAME_DISALLOWED_RE.sub('', name)
     
-    # Remove multiple consecutive spaces
-    name = re.sub(r'\s+', ' ', name)
+    # Collapse whitespace runs (and any left at the ends by the filter)
+    name = ' '.join(name.split())
     
     # HTML escape
-    name = html.escape(name, quote=True)
+    name = str(escape(name))
     
     return name
 
@@ -60,16 +105,23 @@ def sanitize_player_name(name):
     if name is None:
         return ""
     
-    name = str(name).strip()[:10]  # Max 10 characters for player names
+    name = _clip(str(name), 10)  # Max 10 characters for player names
+    
+    # Empty or plain ASCII alphanumeric names pass every filter unchanged
+    if not name or (name.isascii() and name.isalnum()):
+        return name
+    
+    if name.isascii():
+        return ' '.join(name.translate(_PLAYER_NAME_ASCII_DELETE).split())
     
     # Allow alphanumeric, spaces, hyphens, underscores, dots
-    name = re.sub(r'[^\w\s\-_.]', '', name, flags=re.UNICODE)
+    name = _PLAYER_NAME_DISALLOWED_RE.sub('', name)
     
-    # Remove multiple consecutive spaces
-    name = re.sub(r'\s+', ' ', name)
+    # Collapse whitespace runs (and any left at the ends by the filter)
+    name = ' '.join(name.split())
     
     # HTML escape
-    name = html.escape(name, quote=True)
+    name = str(escape(name))
     
     return name
 
@@ -79,11 +131,13 @@ def sanitize_message(message):
     if message is None:
         return ""
     
-    message = str(message).strip()[:500]
+    message = _clip(str(message), 500)
+    if _HTML_META_CHARS.isdisjoint(message):
+        return message
     
     # Remove potentially dangerous tags but keep basic formatting intent
     # HTML escape everything
-    message = html.escape(message, quote=True)
+    message = str(escape(message))
     
     return message
 
@@ -251,56 +305,8 @@ def get_all_themes():
     return THEMES
 
 
-def generate_theme_css(theme_id):
-    """Generate CSS custom properties for a theme"""
-    theme = get_theme(theme_id)
-    
-    css = f"""
-    :root {{
-        --ru-primary: {theme['primary']};
-        --ru-secondary: {theme['secondary']};
-        --ru-dark: {theme['dark']};
-        --ru-darker: {theme['darker']};
-        --ru-light: {theme['light']};
-        --ru-text: {theme['text']};
-        --ru-muted: {theme['muted']};
-        --ru-border: {theme['border']};
-        --ru-success: {theme['success']};
-        --ru-danger: {theme['danger']};
-        --theme-type: {theme['type']};
-        --glow-color: {theme.get('glow_color', 'rgba(255,255,255,0.2)')};
-    }}
-    
-    body {{
-        background: {theme.get('bg_gradient', theme['darker'])};
-        background-attachment: fixed;
-    }}
-    
-    body::before {{
-        content: '';
-        position: fixed;
-        top: 0;
-        left: 0;
-        width: 100%;
-        height: 100%;
-        background-image: {theme.get('bg_pattern', 'none')};
-        background-size: {theme.get('bg_pattern_size', '100% 100%')};
-        pointer-events: none;
-        z-index: -1;
-    }}
-    
-    .card {{
-        box-shadow: {theme.get('card_glow', 'none')} !important;
-    }}
-    
-    .btn-ru:hover {{
-        box-shadow: 0 0 15px var(--glow-color);
-    }}
-    """
-    
-    # Hacker theme special effects
-    if theme.get('scanline'):
-        css += """
+# Hacker theme special effects
+_SCANLINE_CSS = """
     body::after {
         content: '';
         position: fixed;
@@ -395,10 +401,10 @@ def generate_theme_css(theme_id):
         100% { transform: translateY(0); }
     }
     """
-    
-    # Princess theme special effects  
-    if theme.get('sparkle'):
-        css += """
+
+
+# Princess theme special effects
+_SPARKLE_CSS = """
     body::after {
         content: '✨ ⭐ 💖 ✨ ⭐ 💖 ✨ ⭐ 💖 ✨';
         position: fixed;
@@ -435,10 +441,10 @@ def generate_theme_css(theme_id):
         color: var(--ru-primary) !important;
     }
     """
-    
-    # Neon arcade theme special effects
-    if theme_id == 'neon':
-        css += """
+
+
+# Neon arcade theme special effects
+_NEON_CSS = """
     /* Neon glow pulse animation */
     @keyframes neon-pulse {
         0%, 100% { 
@@ -480,10 +486,9 @@ def generate_theme_css(theme_id):
     }
     """
 
-    
-    # Light theme specific overrides
-    if theme['type'] == 'light':
-        css += """
+
+# Light theme specific overrides
+_LIGHT_CSS = """
     .navbar {
         background-color: var(--ru-secondary) !important;
         border-bottom: 1px solid var(--ru-border);
@@ -525,5 +530,79 @@ def generate_theme_css(theme_id):
         color: var(--ru-text);
     }
     """
+
+
+# Base theme block, rendered once per theme at import
+_ROOT_CSS_TEMPLATE = """
+    :root {{
+        --ru-primary: {primary};
+        --ru-secondary: {secondary};
+        --ru-dark: {dark};
+        --ru-darker: {darker};
+        --ru-light: {light};
+        --ru-text: {text};
+        --ru-muted: {muted};
+        --ru-border: {border};
+        --ru-success: {success};
+        --ru-danger: {danger};
+        --theme-type: {type};
+        --glow-color: {glow_color};
+    }}
+    
+    body {{
+        background: {bg_gradient};
+        background-attachment: fixed;
+    }}
+    
+    body::before {{
+        content: '';
+        position: fixed;
+        top: 0;
+        left: 0;
+        width: 100%;
+        height: 100%;
+        background-image: {bg_pattern};
+        background-size: {bg_pattern_size};
+        pointer-events: none;
+        z-index: -1;
+    }}
+    
+    .card {{
+        box-shadow: {card_glow} !important;
+    }}
+    
+    .btn-ru:hover {{
+        box-shadow: 0 0 15px var(--glow-color);
+    }}
+    """
+
+# Every theme defines all the template fields, so this fails at import if one is missing
+_ROOT_CSS = {theme_id: _ROOT_CSS_TEMPLATE.format(**theme) for theme_id, theme in THEMES.items()}
+
+
+@lru_cache(maxsize=16)
+def generate_theme_css(theme_id):
+    """Generate CSS custom properties for a theme (cached; THEMES never changes)"""
+    theme = get_theme(theme_id)
     
-    return css
+    parts = [_ROOT_CSS.get(theme_id, _ROOT_CSS['dark-orange'])]
+    
+    if theme.get('scanline'):
+        parts.append(_SCANLINE_CSS)
+    
+    if theme.get('sparkle'):
+        parts.append(_SPARKLE_CSS)
+    
+    if theme_id == 'neon':
+        parts.append(_NEON_CSS)
+    
+    if theme['type'] == 'light':
+        parts.append(_LIGHT_CSS)
+    
+    return ''.join(parts)
+
+
+@lru_cache(maxsize=16)
+def theme_css_etag(theme_id):
+    """Content hash of a theme's CSS, used as its ETag and cache-busting version"""
+    return hashlib.md5(generate_theme_css(theme_id).encode(), usedforsecurity=False).hexdigest()
@@ -1,11 +1,13 @@
 import os
 import secrets
+from functools import lru_cache
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
 
+@lru_cache(maxsize=1)
 def get_secret_key():
-    """Get or generate a secure secret key"""
+    """Get or generate a secure secret key (read once per process)"""
     # First check environment variable
     key = os.environ.get('SECRET_KEY')
     if key:
@@ -14,18 +16,40 @@ def get_secret_key():
     # Check for a key file
     key_file = os.path.join(basedir, '.secret_key')
     if os.path.exists(key_file):
-        with open(key_file, 'r') as f:
-            return f.read().strip()
+        with open(key_file, 'rb') as f:
+            return f.read().decode('ascii').strip()
     
-    # Generate a new key and save it
+    # Generate a new key and save it. The key is written to a private temp
+    # file first and then hard-linked into place, so the key file only ever
+    # appears complete; link() fails if another worker got there first, and
+    # the loser reads the winner's key instead of writing its own.
     key = secrets.token_hex(32)
-    with open(key_file, 'w') as f:
-        f.write(key)
+    tmp_file = f'{key_file}.{os.getpid()}.tmp'
+    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(key)
+        os.link(tmp_file, key_file)
+    except FileExistsError:
+        with open(key_file, 'rb') as f:
+            return f.read().decode('ascii').strip()
+    finally:
+        os.unlink(tmp_file)
     return key
 
 
 class Config:
-    SECRET_KEY = get_secret_key()
+    # Resolved in create_app (get_secret_key) only when neither the environment
+    # nor the config class provides one, so importing config does no file I/O
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+    # Key for hashing API tokens; unkeyed SHA-256 when unset. Changing it
+    # invalidates every issued token
+    TOKEN_PEPPER = os.environ.get('TOKEN_PEPPER')
+    # Werkzeug hash method for admin passwords
+    PASSWORD_HASH_METHOD = 'scrypt'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'tournament.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Public base URL (e.g. http://192.168.1.10:5000) for TV pairing links;
+    # taken from each request's host when unset
+    PUBLIC_URL = os.environ.get('PUBLIC_URL')
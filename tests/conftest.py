@@ -4,29 +4,67 @@ Pytest configuration and fixtures for the scoreboard application.
 import pytest
 import os
 import sys
+from functools import lru_cache
+
+from sqlalchemy import event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import create_app, db
 from app.models import Admin, Tournament, Team, Match, APIToken
+from app.blueprints.admin import _standings_cache
+from app.blueprints.api import _display_state_cache
+from app.blueprints.socket_events import _last_seen_written
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'smoke: quick page-load checks of the UI routes')
 
 
 class TestConfig:
     """Test configuration."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # One connection for every checkout, so all app contexts, the SocketIO
+    # test client and background tasks see the same in-memory database.
+    # isolation_level=None stops pysqlite from issuing BEGIN lazily (and
+    # committing the outer transaction on the first RELEASE); _db emits BEGIN
+    # itself so per-test SAVEPOINTs nest inside it
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'poolclass': StaticPool,
+        'connect_args': {'check_same_thread': False, 'isolation_level': None}
+    }
     SECRET_KEY = 'test-secret-key'
+    # Single-iteration hashing; the production scrypt cost adds nothing here
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1'
     WTF_CSRF_ENABLED = False
     WTF_CSRF_CHECK_DEFAULT = False
 
 
-@pytest.fixture
+@lru_cache(maxsize=None)
+def _cached_app(config_class):
+    """Build the app once per config class; blueprints and SocketIO are set up once."""
+    return create_app(config_class)
+
+
+@pytest.fixture(scope='session')
 def app():
-    """Create and configure a test application instance."""
-    app = create_app(TestConfig)
-    
+    """Create and configure the test application, shared by the whole run."""
+    return _cached_app(TestConfig)
+
+
+@pytest.fixture(scope='session')
+def _db(app):
+    """Create the schema and test admin once for the session."""
     with app.app_context():
+        # The driver's own BEGIN is disabled in TestConfig; start transactions explicitly
+        @event.listens_for(db.engine, 'begin')
+        def _emit_begin(connection):
+            connection.exec_driver_sql('BEGIN')
+        
         db.create_all()
         
         # Create test admin
@@ -34,25 +72,74 @@ def app():
         admin.set_password('testpassword')
         db.session.add(admin)
         db.session.commit()
-        
-        yield app
-        
         db.session.remove()
+    
+    yield db
+    
+    with app.app_context():
         db.drop_all()
 
 
+@pytest.fixture(autouse=True)
+def db_session(app, _db):
+    """Run each test inside a transaction that is rolled back afterwards.
+    
+    Every app context's session joins one outer connection-level transaction,
+    and commits made by the code under test only release SAVEPOINTs.
+    """
+    ctx = app.app_context()
+    ctx.push()
+    connection = db.engine.connect()
+    transaction = connection.begin()
+    app_session = db.session
+    # A plain Session honours bind=; Flask-SQLAlchemy's get_bind always picks
+    # the engine. Scoped per app context, like the session it replaces
+    db.session = scoped_session(
+        sessionmaker(bind=connection, query_cls=db.Query, join_transaction_mode='create_savepoint'),
+        scopefunc=app_session.registry.scopefunc
+    )
+    
+    yield db.session
+    
+    db.session.remove()
+    db.session = app_session
+    transaction.rollback()
+    connection.close()
+    
+    # Module-level caches may hold rows from the rolled-back transaction
+    _display_state_cache.clear()
+    # flush_heartbeats swaps the buffer out, so reach it through the module
+    sys.modules['app.blueprints.api']._heartbeat_buffer.clear()
+    _standings_cache.clear()
+    _last_seen_written.clear()
+    ctx.pop()
+
+
 @pytest.fixture
 def client(app):
     """Create a test client."""
     return app.test_client()
 
 
-@pytest.fixture
-def authenticated_client(app, client):
-    """Create an authenticated test client."""
+@pytest.fixture(scope='session')
+def _admin_session_cookie(app):
+    """Sign the test admin's session cookie once for the whole run."""
+    client = app.test_client()
     with client.session_transaction() as sess:
         sess['admin_id'] = 1
         sess['admin_username'] = 'testadmin'
+    return client.get_cookie(app.config['SESSION_COOKIE_NAME']).value
+
+
+@pytest.fixture
+def authenticated_client(app, _admin_session_cookie):
+    """Create an authenticated test client.
+    
+    Each test gets its own client (and cookie jar), separate from the
+    anonymous ``client``, carrying the pre-signed admin cookie.
+    """
+    client = app.test_client()
+    client.set_cookie(app.config['SESSION_COOKIE_NAME'], _admin_session_cookie)
     return client
 
 
@@ -60,57 +147,68 @@ def authenticated_client(app, client):
 def test_tournament(app):
     """Create a test tournament."""
     with app.app_context():
-        tournament = Tournament(
-            name='Test Tournament',
-            format='single_elimination',
-            timer_duration=150,
-            registration_code='TEST01',
-            owner_id=1
-        )
-        db.session.add(tournament)
+        tournament_id = db.session.execute(
+            db.insert(Tournament).returning(Tournament.id),
+            {
+                'name': 'Test Tournament',
+                'format': 'single_elimination',
+                'timer_duration': 150,
+                'registration_code': 'TEST01',
+                'owner_id': 1
+            }
+        ).scalar_one()
         db.session.commit()
-        return tournament.id
+        return tournament_id
 
 
 @pytest.fixture
 def test_teams(app, test_tournament):
     """Create test teams."""
     with app.app_context():
-        teams = []
-        for i in range(4):
-            team = Team(
-                name=f'Team {i+1}',
-                player1=f'Player {i*2+1}',
-                player2=f'Player {i*2+2}',
-                tournament_id=test_tournament,
-                is_confirmed=True
-            )
-            db.session.add(team)
-            teams.append(team)
+        team_ids = db.session.execute(
+            db.insert(Team).returning(Team.id, sort_by_parameter_order=True),
+            [
+                {
+                    'name': f'Team {i+1}',
+                    'player1': f'Player {i*2+1}',
+                    'player2': f'Player {i*2+2}',
+                    'tournament_id': test_tournament,
+                    'is_confirmed': True
+                }
+                for i in range(4)
+            ]
+        ).scalars().all()
         db.session.commit()
-        return [t.id for t in teams]
+        return team_ids
 
 
 @pytest.fixture
 def test_match(app, test_tournament, test_teams):
     """Create a test match."""
     with app.app_context():
-        match = Match(
-            tournament_id=test_tournament,
-            round_number=1,
-            match_number=1,
-            team1_id=test_teams[0],
-            team2_id=test_teams[1],
-            is_current=True
-        )
-        db.session.add(match)
+        # Not completed, so skipping the Match insert event leaves standings as they are
+        match_id = db.session.execute(
+            db.insert(Match).returning(Match.id),
+            {
+                'tournament_id': test_tournament,
+                'round_number': 1,
+                'match_number': 1,
+                'team1_id': test_teams[0],
+                'team2_id': test_teams[1],
+                'is_current': True
+            }
+        ).scalar_one()
         db.session.commit()
-        return match.id
+        return match_id
 
 
-@pytest.fixture
-def api_token(app):
-    """Create an API token for testing."""
+@pytest.fixture(scope='session')
+def api_token(app, _db):
+    """Create an API token once for the whole run.
+    
+    Session-scoped fixtures are set up before db_session, so the row is
+    committed outside the per-test transaction and survives its rollback.
+    """
     with app.app_context():
         token, raw_token = APIToken.create_token(
             name='Test Token',
@@ -119,4 +217,5 @@ def api_token(app):
         )
         db.session.add(token)
         db.session.commit()
-        return raw_token
+        db.session.remove()
+    return raw_token
@@ -1,8 +1,9 @@
 """
 Tests for admin routes and functionality.
 """
+import sys
+
 import pytest
-import json
 
 
 class TestAdminAuthentication:
@@ -18,21 +19,35 @@ class TestAdminAuthentication:
         response = client.post('/login', data={
             'username': 'testadmin',
             'password': 'testpassword'
-        }, follow_redirects=True)
-        assert response.status_code == 200
+        })
+        assert response.status_code == 302
+        assert response.location == '/admin/'
     
     def test_login_wrong_password(self, client):
         """Test login with wrong password."""
         response = client.post('/login', data={
             'username': 'testadmin',
             'password': 'wrongpassword'
-        }, follow_redirects=True)
-        assert b'Invalid' in response.data or response.status_code == 200
+        })
+        assert response.status_code == 200
+        assert b'Invalid username or password' in response.data
+    
+    def test_login_without_hash_method_config(self, app, client, monkeypatch):
+        """Test config classes without PASSWORD_HASH_METHOD fall back to scrypt."""
+        monkeypatch.delitem(app.config, 'PASSWORD_HASH_METHOD')
+        response = client.post('/login', data={
+            'username': 'nobody',
+            'password': 'wrongpassword'
+        })
+        assert response.status_code == 200
+        assert b'Invalid username or password' in response.data
     
     def test_logout(self, authenticated_client):
         """Test logout."""
-        response = authenticated_client.get('/logout', follow_redirects=True)
-        assert response.status_code == 200
+        response = authenticated_client.get('/logout')
+        assert response.status_code == 302
+        with authenticated_client.session_transaction() as sess:
+            assert 'admin_id' not in sess
 
 
 class TestAdminDashboard:
@@ -65,7 +80,7 @@ class TestAPITokenManagement:
             content_type='application/json'
         )
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['success'] is True
         assert 'token' in data
         assert len(data['token']) > 20  # Token should be reasonably long
@@ -82,7 +97,7 @@ class TestAPITokenManagement:
         # Then list
         response = authenticated_client.get('/admin/api-tokens/list')
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'tokens' in data
         assert len(data['tokens']) >= 1
 
@@ -99,6 +114,27 @@ class TestTournamentManagement:
         """Test viewing a tournament."""
         response = authenticated_client.get(f'/admin/tournaments/{test_tournament}')
         assert response.status_code == 200
+    
+    def test_start_tournament_is_atomic(self, app, authenticated_client, test_tournament, test_teams, monkeypatch):
+        """Test a failed bracket build leaves the tournament unstarted."""
+        from app import db
+        from app.models import Tournament
+        
+        def broken_builder(tournament_id, team_ids):
+            raise RuntimeError('bracket build failed')
+        
+        monkeypatch.setattr(sys.modules['app.blueprints.bracket'], 'create_single_elimination_bracket', broken_builder)
+        with pytest.raises(RuntimeError):
+            authenticated_client.post(f'/admin/tournament/{test_tournament}/start')
+        
+        # The test shares the request's app context; drop what teardown would
+        db.session.rollback()
+        assert db.session.get(Tournament, test_tournament).status != 'in_progress'
+        
+        monkeypatch.undo()
+        response = authenticated_client.post(f'/admin/tournament/{test_tournament}/start')
+        assert response.get_json()['success']
+        assert db.session.get(Tournament, test_tournament).status == 'in_progress'
 
 
 class TestTeamManagement:
@@ -117,3 +153,80 @@ class TestUserManagement:
         """Test users page loads."""
         response = authenticated_client.get('/admin/users')
         assert response.status_code == 200
+
+
+class TestStandings:
+    """Test standings calculation and caching."""
+    
+    def test_standings_refresh_after_result(self, app, test_tournament, test_teams):
+        """Test cached standings are recalculated once a match result changes."""
+        from app import db
+        from app.models import Match
+        from app.blueprints.admin import calculate_standings
+        
+        match = Match(tournament_id=test_tournament, round_number=1, match_number=1,
+                      team1_id=test_teams[0], team2_id=test_teams[1])
+        db.session.add(match)
+        db.session.commit()
+        assert calculate_standings(test_tournament) == []
+        
+        match.team1_score = 3
+        match.winner_id = test_teams[0]
+        match.is_completed = True
+        db.session.commit()
+        
+        standings = calculate_standings(test_tournament)
+        assert standings[0]['team_id'] == test_teams[0]
+        assert standings[0]['wins'] == 1
+        
+        # Served from cache, with Team objects re-attached
+        cached = calculate_standings(test_tournament)
+        assert cached[0]['wins'] == 1
+        assert cached[0]['team'].name == 'Team 1'
+    
+    def test_standings_cache_is_bounded(self, app, test_tournament, monkeypatch):
+        """Test the standings cache evicts the least recently used and deleted tournaments."""
+        from app import db
+        from app.models import Tournament
+        from app.blueprints.admin import calculate_standings, _standings_cache
+        
+        # app.blueprints.admin resolves to the Blueprint, so patch the module itself
+        monkeypatch.setattr(sys.modules['app.blueprints.admin'], 'STANDINGS_CACHE_SIZE', 1)
+        other = Tournament(name='Other')
+        db.session.add(other)
+        db.session.commit()
+        
+        calculate_standings(test_tournament)
+        calculate_standings(other.id)
+        assert list(_standings_cache) == [other.id]
+        
+        db.session.delete(other)
+        db.session.commit()
+        assert calculate_standings(other.id) == []
+        assert _standings_cache == {}
+    
+    def test_advance_to_playoffs_seeds_semifinals(self, app, authenticated_client, test_tournament, test_teams):
+        """Test the top 4 are seeded 1v4 and 2v3 into the semifinals."""
+        from app import db
+        from app.models import Match, Tournament
+        
+        tournament = db.session.get(Tournament, test_tournament)
+        tournament.format = 'round_robin_playoffs'
+        # Team i wins (4 - i) group games
+        for i, team_id in enumerate(test_teams):
+            for n in range(4 - i):
+                db.session.add(Match(tournament_id=test_tournament, round_number=1, match_number=10 * i + n,
+                                     team1_id=team_id, team1_score=1, winner_id=team_id,
+                                     is_completed=True, match_type='group'))
+        for n in (1, 2):
+            db.session.add(Match(tournament_id=test_tournament, round_number=100, match_number=n, match_type='bracket'))
+        db.session.commit()
+        
+        authenticated_client.post(f'/admin/tournaments/{test_tournament}/advance-to-playoffs')
+        
+        db.session.expire_all()
+        semis = Match.query.filter_by(tournament_id=test_tournament, round_number=100).order_by(Match.match_number).all()
+        assert (semis[0].team1_id, semis[0].team2_id) == (test_teams[0], test_teams[3])
+        assert (semis[1].team1_id, semis[1].team2_id) == (test_teams[1], test_teams[2])
+        assert semis[0].is_current and not semis[1].is_current
+        assert db.session.get(Tournament, test_tournament).current_phase == 'playoffs'
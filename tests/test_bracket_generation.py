@@ -1,103 +1,120 @@
 
 import pytest
-from app import create_app, db
+from app import db
 from app.models import Tournament, Team, Match
 from app.blueprints.bracket import (
     create_single_elimination_bracket,
     create_double_elimination_bracket,
     create_round_robin,
     create_round_robin_playoffs,
-    create_swiss_round
+    create_swiss_round,
+    round_robin_schedule
 )
 
-class TestBracketReproduction:
-    def setup_method(self):
-        from tests.conftest import TestConfig
-        self.app = create_app(TestConfig)
-        self.app_context = self.app.app_context()
-        self.app_context.push()
-        db.create_all()
+BUILDERS = {
+    'single_elimination': create_single_elimination_bracket,
+    'double_elimination': create_double_elimination_bracket,
+    'round_robin': create_round_robin,
+    'round_robin_playoffs': create_round_robin_playoffs,
+    'swiss': create_swiss_round,
+}
 
-    def teardown_method(self):
-        db.session.remove()
-        db.drop_all()
-        self.app_context.pop()
+# (format, team count) -> matches created. Odd counts get byes; playoffs add
+# two semifinals and a final; Swiss builds only the first round
+EXPECTED_MATCH_COUNTS = {
+    ('single_elimination', 2): 1,
+    ('single_elimination', 3): 3,
+    ('single_elimination', 4): 3,
+    ('single_elimination', 64): 63,
+    ('double_elimination', 2): 2,
+    ('double_elimination', 3): 6,
+    ('double_elimination', 4): 6,
+    ('double_elimination', 64): 126,
+    ('round_robin', 2): 1,
+    ('round_robin', 3): 3,
+    ('round_robin', 4): 6,
+    ('round_robin', 64): 2016,
+    ('round_robin_playoffs', 2): 4,
+    ('round_robin_playoffs', 3): 6,
+    ('round_robin_playoffs', 4): 9,
+    ('round_robin_playoffs', 64): 2019,
+    ('swiss', 2): 1,
+    ('swiss', 3): 2,
+    ('swiss', 4): 2,
+    ('swiss', 64): 32,
+}
 
+@pytest.mark.usefixtures('app')
+class TestBracketReproduction:
     def create_tournament_and_teams(self, num_teams):
         tournament = Tournament(name='Test', format='test')
         db.session.add(tournament)
+        db.session.flush()
+        
+        teams = [
+            Team(name=f'Team {i}', player1=f'P1_{i}', player2=f'P2_{i}', tournament_id=tournament.id)
+            for i in range(num_teams)
+        ]
+        db.session.add_all(teams)
         db.session.commit()
         
-        team_ids = []
-        for i in range(num_teams):
-            team = Team(name=f'Team {i}', player1=f'P1_{i}', player2=f'P2_{i}', tournament_id=tournament.id)
-            db.session.add(team)
-            db.session.commit()
-            team_ids.append(team.id)
-            
-        return tournament.id, team_ids
+        return tournament.id, [team.id for team in teams]
 
-    def test_round_robin_four_teams(self):
-        """Test round robin with 4 teams - User says it's broken, probably referring to payoffs variant"""
-        t_id, team_ids = self.create_tournament_and_teams(4)
+    def test_round_robin_schedule_odd_teams(self):
+        """Test every pairing is played once and no team plays twice in a round"""
+        schedule = round_robin_schedule([1, 2, 3, 4, 5])
         
-        # Test standard round robin - expect success (based on code analysis)
-        create_round_robin(t_id, team_ids)
-        matches = Match.query.filter_by(tournament_id=t_id).all()
-        # 4 teams -> 6 matches matches?
-        # Code says: max(1, 4//2) = 2 matches per round. 6 pairings. 
-        # Check if matches created
-        assert len(matches) > 0, "Round robin for 4 teams created no matches"
+        pairings = {frozenset((t1, t2)) for _, _, t1, t2 in schedule}
+        assert len(schedule) == 10
+        assert len(pairings) == 10
         
-        # Clear matches for next check
-        Match.query.delete()
-        db.session.commit()
+        for round_num in {r for r, _, _, _ in schedule}:
+            teams = [t for r, _, t1, t2 in schedule if r == round_num for t in (t1, t2)]
+            assert len(teams) == len(set(teams))
     
-    def test_round_robin_playoffs_four_teams(self):
-        """Test round robin playoffs with 4 teams - Should now WORK"""
-        t_id, team_ids = self.create_tournament_and_teams(4)
+    def test_seeded_bracket_is_reproducible(self):
+        """Test the same seed draws the same first round"""
+        t_id, team_ids = self.create_tournament_and_teams(8)
         
-        create_round_robin_playoffs(t_id, team_ids)
-        matches = Match.query.filter_by(tournament_id=t_id).all()
+        draws = []
+        for _ in range(2):
+            create_single_elimination_bracket(t_id, team_ids, seed=42)
+            first_round = Match.query.filter_by(tournament_id=t_id, round_number=1).order_by(Match.match_number).all()
+            draws.append([(m.team1_id, m.team2_id) for m in first_round])
+            Match.query.delete()
+            db.session.commit()
         
-        # 4 teams round robin: 6 matches
-        # Plus Playoffs: Semi1, Semi2, Finals = 3 matches
-        # Total = 9 matches
-        assert len(matches) == 9, f"Expected 9 matches, got {len(matches)}"
-
-    def test_brackets_two_teams(self):
-        """Test all bracket types with 2 teams - Should all WORK now"""
-        t_id, team_ids = self.create_tournament_and_teams(2)
+        assert draws[0] == draws[1]
+    
+    def test_swiss_round_odd_teams_gets_bye(self):
+        """Test an odd Swiss round pairs everyone and completes the bye"""
+        t_id, team_ids = self.create_tournament_and_teams(5)
         
-        # 1. Single Elimination
-        create_single_elimination_bracket(t_id, team_ids)
-        matches = Match.query.filter_by(tournament_id=t_id).all()
-        assert len(matches) == 1, "Single Elim 2 teams should have 1 match"
-        Match.query.delete()
-        db.session.commit()
+        create_swiss_round(t_id, team_ids)
+        matches = Match.query.filter_by(tournament_id=t_id).order_by(Match.match_number).all()
         
-        # 2. Double Elimination
-        create_double_elimination_bracket(t_id, team_ids)
-        matches = Match.query.filter_by(tournament_id=t_id).all()
-        # 2 teams: power of 2 is 2. 
-        # Winners bracket: 1 round, 1 match.
-        # Losers bracket: (1-1)*2 = 0 rounds? No, code logic might be tricky for 2 teams.
-        # Let's count: Winners (1) + Finals (1) = 2 matches. Losers bracket loops might not run.
-        # Just ensure we have matches and a finals.
-        assert len(matches) >= 2, f"Double Elim 2 teams should have at least 2 matches, got {len(matches)}"
-        Match.query.delete()
-        db.session.commit()
+        assert len(matches) == 3
+        assert matches[-1].team2_id is None
+        assert matches[-1].is_completed and matches[-1].winner_id == matches[-1].team1_id
+        assert matches[0].is_current
+    
+    def test_round_robin_playoffs_semis_feed_finals(self):
+        """Test both semifinals point at the finals match"""
+        t_id, team_ids = self.create_tournament_and_teams(4)
         
-        # 3. Round Robin
-        create_round_robin(t_id, team_ids)
-        matches = Match.query.filter_by(tournament_id=t_id).all()
-        # 2 teams: 1 pair. 1 match.
-        assert len(matches) == 1, "Round Robin 2 teams should have 1 match"
-        Match.query.delete()
-        db.session.commit()
+        create_round_robin_playoffs(t_id, team_ids)
+        finals = Match.query.filter_by(tournament_id=t_id, match_type='finals').one()
+        semis = Match.query.filter_by(tournament_id=t_id, match_type='bracket').all()
+        
+        assert [s.next_match_id for s in semis] == [finals.id, finals.id]
+        assert Match.query.filter_by(tournament_id=t_id, is_current=True).count() == 1
 
-        # 4. Swiss
-        create_swiss_round(t_id, team_ids)
-        matches = Match.query.filter_by(tournament_id=t_id).all()
-        # 2 teams: 1 match.
-        assert len(matches) == 1, "Swiss 2 teams should have 1 match"
+    @pytest.mark.parametrize('fmt, count, expected', [
+        (fmt, count, expected) for (fmt, count), expected in EXPECTED_MATCH_COUNTS.items()
+    ], ids=[f'{fmt}-{count}' for fmt, count in EXPECTED_MATCH_COUNTS])
+    def test_match_counts(self, fmt, count, expected):
+        """Test every format builds the expected number of matches for small, odd and large fields"""
+        t_id, team_ids = self.create_tournament_and_teams(count)
+        
+        BUILDERS[fmt](t_id, team_ids)
+        assert Match.query.filter_by(tournament_id=t_id).count() == expected
@@ -2,7 +2,6 @@
 Tests for the external API endpoints.
 """
 import pytest
-import json
 
 
 class TestAPIHealthAndScopes:
@@ -12,7 +11,7 @@ class TestAPIHealthAndScopes:
         """Test health endpoint returns OK."""
         response = client.get('/ext/v1/health')
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['status'] == 'ok'
         assert 'version' in data
     
@@ -20,11 +19,31 @@ class TestAPIHealthAndScopes:
         """Test scopes endpoint returns available scopes."""
         response = client.get('/ext/v1/scopes')
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'scopes' in data
         assert 'score:write' in data['scopes']
 
 
+class TestTokenHashing:
+    """Test API token hashing."""
+    
+    def test_hash_ignores_secret_key(self, app, monkeypatch):
+        """Test tokens hash to hex, keyed only by TOKEN_PEPPER and not SECRET_KEY."""
+        import hashlib
+        from app.models import APIToken
+        
+        plain = APIToken.hash_token('raw-token')
+        assert plain == hashlib.sha256(b'raw-token').hexdigest()
+        
+        monkeypatch.setitem(app.config, 'SECRET_KEY', 'rotated')
+        assert APIToken.hash_token('raw-token') == plain
+        
+        monkeypatch.setitem(app.config, 'TOKEN_PEPPER', 'pepper')
+        peppered = APIToken.hash_token('raw-token')
+        assert peppered != plain
+        assert len(peppered) == 64
+
+
 class TestAPIAuthentication:
     """Test API token authentication."""
     
@@ -32,7 +51,7 @@ class TestAPIAuthentication:
         """Test request without auth header fails."""
         response = client.get(f'/ext/v1/tournament/{test_tournament}')
         assert response.status_code == 401
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'error' in data
     
     def test_invalid_token(self, client, test_tournament):
@@ -50,6 +69,20 @@ class TestAPIAuthentication:
             headers={'Authorization': f'Bearer {api_token}'}
         )
         assert response.status_code == 200
+    
+    def test_expiring_token_works(self, authenticated_client, test_tournament):
+        """Test a token with an expiry date validates after being reloaded."""
+        response = authenticated_client.post(
+            '/admin/api-tokens/create',
+            json={'name': 'Expiring Token', 'expires_days': 7}
+        )
+        raw_token = response.get_json()['token']
+        
+        response = authenticated_client.get(
+            f'/ext/v1/tournament/{test_tournament}',
+            headers={'Authorization': f'Bearer {raw_token}'}
+        )
+        assert response.status_code == 200
 
 
 class TestMatchEndpoints:
@@ -62,7 +95,7 @@ class TestMatchEndpoints:
             headers={'Authorization': f'Bearer {api_token}'}
         )
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'match' in data
         assert data['match']['id'] == test_match
     
@@ -74,7 +107,7 @@ class TestMatchEndpoints:
             json={'team': 1}
         )
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['success'] is True
         assert data['team1_score'] == 1
         assert data['team2_score'] == 0
@@ -87,7 +120,7 @@ class TestMatchEndpoints:
             json={'team': 2}
         )
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['success'] is True
         assert data['team2_score'] == 1
     
@@ -99,7 +132,7 @@ class TestMatchEndpoints:
             json={'team1_score': 5, 'team2_score': 3}
         )
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['match']['team1_score'] == 5
         assert data['match']['team2_score'] == 3
     
@@ -119,7 +152,7 @@ class TestMatchEndpoints:
             json={}
         )
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['success'] is True
         assert 'winner_id' in data
     
@@ -142,7 +175,7 @@ class TestTournamentEndpoints:
             headers={'Authorization': f'Bearer {api_token}'}
         )
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'tournament' in data
         assert data['tournament']['name'] == 'Test Tournament'
     
@@ -153,7 +186,7 @@ class TestTournamentEndpoints:
             headers={'Authorization': f'Bearer {api_token}'}
         )
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['current_match']['id'] == test_match
     
     def test_tournament_not_found(self, client, api_token):
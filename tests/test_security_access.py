@@ -5,20 +5,18 @@ from app.models import TVSession
 class TestSecurityAccess:
     """Test security restrictions on API endpoints."""
 
-    def test_public_access_denied(self, client, test_tournament):
+    @pytest.mark.parametrize('endpoint', [
+        '/api/match/1',
+        '/api/tournament/{tournament_id}/bracket',
+        '/api/tournament/{tournament_id}/next-match',
+        '/api/tournament/{tournament_id}/stats',
+        '/api/tournament/{tournament_id}/teams'
+    ])
+    def test_public_access_denied(self, client, test_tournament, endpoint):
         """Test that public users are denied access to sensitive data."""
-        endpoints = [
-            f'/api/match/1',
-            f'/api/tournament/{test_tournament}/bracket',
-            f'/api/tournament/{test_tournament}/next-match',
-            f'/api/tournament/{test_tournament}/stats',
-            f'/api/tournament/{test_tournament}/teams'
-        ]
-
-        for endpoint in endpoints:
-            response = client.get(endpoint)
-            # Should be 401 Unauthorized or 403 Forbidden
-            assert response.status_code == 401, f"Endpoint {endpoint} should be protected"
+        response = client.get(endpoint.format(tournament_id=test_tournament))
+        # Should be 401 Unauthorized or 403 Forbidden
+        assert response.status_code == 401, f"Endpoint {endpoint} should be protected"
 
     def test_admin_access_allowed(self, authenticated_client, test_tournament, test_match):
         """Test that admins can access sensitive data."""
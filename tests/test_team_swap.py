@@ -1,68 +1,65 @@
-
 import pytest
-from app import create_app, db
+from app import db
 from app.models import Tournament, Team, Match
 
-class TestTeamSwap:
-    def setup_method(self):
-        from tests.conftest import TestConfig
-        self.app = create_app(TestConfig)
-        self.client = self.app.test_client()
-        self.app_context = self.app.app_context()
-        self.app_context.push()
-        db.create_all()
-
-        # Create auth session
-        with self.client.session_transaction() as sess:
-            sess['admin_id'] = 1
-            sess['admin_username'] = 'testadmin'
+def test_swap_teams(authenticated_client, db_session):
+    # Create tournament and teams
+    t = Tournament(name='Test T', owner_id=1)
+    db.session.add(t)
+    db.session.flush()
+    
+    team1 = Team(name='Team 1', player1='P1', player2='P2', tournament_id=t.id)
+    team2 = Team(name='Team 2', player1='P3', player2='P4', tournament_id=t.id)
+    db.session.add_all([team1, team2])
+    db.session.flush()
+    
+    # Create match
+    m = Match(
+        tournament_id=t.id, 
+        round_number=1, 
+        match_number=1, 
+        team1_id=team1.id, 
+        team2_id=team2.id,
+        team1_score=10,
+        team2_score=5
+    )
+    db.session.add(m)
+    db.session.commit()
+    
+    # Verify initial state
+    assert m.team1_id == team1.id
+    assert m.team2_id == team2.id
+    assert m.team1_score == 10
+    assert m.team2_score == 5
+    
+    # Call swap endpoint
+    resp = authenticated_client.post(f'/api/match/{m.id}/swap-teams')
+    assert resp.status_code == 200
+    
+    # Reload match
+    db.session.expire_all()
+    m = db.session.get(Match, m.id)
+    
+    # Verify swapped state
+    assert m.team1_id == team2.id
+    assert m.team2_id == team1.id
+    # Scores should also swap
+    assert m.team1_score == 5
+    assert m.team2_score == 10
 
-    def teardown_method(self):
-        db.session.remove()
-        db.drop_all()
-        self.app_context.pop()
 
-    def test_swap_teams(self):
-        # Create tournament and teams
-        t = Tournament(name='Test T', owner_id=1)
-        db.session.add(t)
-        db.session.commit()
-        
-        team1 = Team(name='Team 1', player1='P1', player2='P2', tournament_id=t.id)
-        team2 = Team(name='Team 2', player1='P3', player2='P4', tournament_id=t.id)
-        db.session.add(team1)
-        db.session.add(team2)
-        db.session.commit()
-        
-        # Create match
-        m = Match(
-            tournament_id=t.id, 
-            round_number=1, 
-            match_number=1, 
-            team1_id=team1.id, 
-            team2_id=team2.id,
-            team1_score=10,
-            team2_score=5
-        )
-        db.session.add(m)
-        db.session.commit()
-        
-        # Verify initial state
-        assert m.team1_id == team1.id
-        assert m.team2_id == team2.id
-        assert m.team1_score == 10
-        assert m.team2_score == 5
-        
-        # Call swap endpoint
-        resp = self.client.post(f'/api/match/{m.id}/swap-teams')
-        assert resp.status_code == 200
-        
-        # Reload match
-        db.session.refresh(m)
-        
-        # Verify swapped state
-        assert m.team1_id == team2.id
-        assert m.team2_id == team1.id
-        # Scores should also swap
-        assert m.team1_score == 5
-        assert m.team2_score == 10
+def test_swap_score_update_goes_to_tournament_room(app, authenticated_client, test_match, test_tournament):
+    from app import socketio
+    
+    follower = socketio.test_client(app)
+    follower.emit('join_tournament', {'tournament_id': test_tournament})
+    bystander = socketio.test_client(app)
+    follower.get_received()
+    
+    resp = authenticated_client.post(f'/api/match/{test_match}/swap-teams')
+    assert resp.status_code == 200
+    
+    assert [e['name'] for e in follower.get_received()] == ['score_update']
+    assert bystander.get_received() == []
+    follower.disconnect()
+    bystander.disconnect()
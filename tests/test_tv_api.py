@@ -0,0 +1,188 @@
+"""
+Tests for the TV session API endpoints.
+"""
+import sys
+from datetime import timedelta
+
+from app import db
+from app.models import TVSession, DisplayState, utc_now
+from app.blueprints.api import flush_heartbeats
+
+
+class TestTVValidation:
+    """Test TV code validation."""
+
+    def test_validate_codes(self, app, authenticated_client):
+        """Test fresh TVs are active and stale or unknown codes are inactive."""
+        with app.app_context():
+            db.session.add(TVSession(code='FRESH1'))
+            db.session.add(TVSession(code='STALE1', last_seen=utc_now() - timedelta(minutes=10)))
+            db.session.commit()
+
+        response = authenticated_client.post('/api/tv/validate', json={
+            'codes': ['fresh1', 'STALE1', 'NOPE99']
+        })
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['active'] == ['fresh1']
+        assert data['inactive'] == ['STALE1', 'NOPE99']
+
+    def test_buffered_heartbeat_counts_as_active(self, app, authenticated_client, client):
+        """Test a heartbeat marks the TV active before it is flushed to the DB."""
+        with app.app_context():
+            db.session.add(TVSession(code='BEAT01', last_seen=utc_now() - timedelta(minutes=10)))
+            db.session.commit()
+
+        response = client.post('/api/tv/BEAT01/heartbeat')
+        assert response.status_code == 200
+
+        response = authenticated_client.post('/api/tv/validate', json={'codes': ['BEAT01']})
+        assert response.get_json()['active'] == ['BEAT01']
+
+        with app.app_context():
+            flush_heartbeats()
+            tv = TVSession.query.filter_by(code='BEAT01').first()
+            assert tv.last_seen > utc_now() - timedelta(minutes=1)
+
+    def test_flush_keeps_each_tvs_heartbeat_time(self, app):
+        """Test a flush records when each TV last beat, not when the flush ran."""
+        # flush_heartbeats swaps the buffer out, so reach it through the module
+        api_module = sys.modules['app.blueprints.api']
+
+        beat = utc_now() - timedelta(minutes=10)
+        with app.app_context():
+            db.session.add_all([TVSession(code='DEAD01', last_seen=beat - timedelta(hours=1)), TVSession(code='LIVE01')])
+            db.session.commit()
+
+            api_module._heartbeat_buffer['DEAD01'] = beat
+            api_module._heartbeat_buffer['LIVE01'] = utc_now()
+            flush_heartbeats()
+            assert api_module._heartbeat_buffer == {}
+
+            db.session.expire_all()
+            assert TVSession.query.filter_by(code='DEAD01').one().last_seen == beat
+            assert TVSession.query.filter_by(code='LIVE01').one().last_seen > beat
+
+
+class TestTVPairing:
+    """Test controller pairing state."""
+
+    def test_pair_all_stores_codes_in_cookie(self, app, authenticated_client):
+        """Test paired codes are kept in the session and unchanged pairings don't re-send it."""
+        with app.app_context():
+            db.session.add_all([TVSession(code='PAIR01'), TVSession(code='PAIR02')])
+            db.session.commit()
+
+        response = authenticated_client.post('/api/tv/pair-all')
+        assert response.get_json()['count'] == 2
+        assert 'Set-Cookie' in response.headers
+
+        with authenticated_client.session_transaction() as sess:
+            assert sorted(sess['tv_codes'].split(',')) == ['PAIR01', 'PAIR02']
+            assert sess['control_all_tvs']
+
+        response = authenticated_client.post('/api/tv/pair-all')
+        assert response.get_json()['success']
+        assert 'Set-Cookie' not in response.headers
+
+        authenticated_client.post('/api/tv/unpair')
+        with authenticated_client.session_transaction() as sess:
+            assert 'tv_codes' not in sess
+            assert 'tv_code' not in sess
+
+
+class TestTVControl:
+    """Test TV control commands."""
+
+    def test_redirect_sent_in_single_control_frame(self, app, authenticated_client, test_tournament):
+        """Test a redirect command arrives as one tv_control event."""
+        from app import socketio
+
+        with app.app_context():
+            db.session.add(TVSession(code='CTRL01'))
+            db.session.commit()
+
+        tv = socketio.test_client(app)
+        sid = socketio.server.manager.sid_from_eio_sid(tv.eio_sid, '/')
+        socketio.server.enter_room(sid, 'tv_CTRL01', namespace='/')
+
+        response = authenticated_client.post('/api/tv/CTRL01/control', json={
+            'mode': 'live',
+            'tournament_id': test_tournament,
+            'redirect_to_live': True
+        })
+        assert response.status_code == 200
+
+        events = tv.get_received()
+        assert [e['name'] for e in events] == ['tv_control']
+        assert events[0]['args'][0]['redirect_url'] == f'/display/live/{test_tournament}'
+        assert 'custom_message' not in events[0]['args'][0]
+        tv.disconnect()
+
+
+    def test_join_tv_tracks_only_active_displays(self, app, monkeypatch):
+        """Test unknown codes aren't remembered and tracked codes stay bounded."""
+        from app import socketio
+        from app.blueprints.socket_events import _last_seen_written
+
+        monkeypatch.setattr(sys.modules['app.blueprints.socket_events'], 'JOIN_TV_TRACKED_MAX', 1)
+        with app.app_context():
+            db.session.add_all([TVSession(code='JOIN01'), TVSession(code='JOIN02')])
+            db.session.commit()
+
+        tv = socketio.test_client(app)
+        for code in ('NOPE01', 'JOIN01', 'JOIN02'):
+            tv.emit('join_tv', {'code': code})
+        tv.disconnect()
+
+        assert list(_last_seen_written) == ['JOIN02']
+
+
+class TestDisplayState:
+    """Test the shared display state endpoint."""
+
+    def test_waiting_mode_shows_current_match_teams(self, app, client, test_tournament, test_match):
+        """Test the current match and its teams are included for waiting screens."""
+        with app.app_context():
+            db.session.add(DisplayState(mode='waiting', tournament_id=test_tournament))
+            db.session.commit()
+
+        data = client.get('/api/display/state').get_json()
+        assert data['tournament']['id'] == test_tournament
+        assert data['current_match']['id'] == test_match
+        assert data['next_match']['team1']['name'] == 'Team 1'
+        assert data['next_match']['team2']['name'] == 'Team 2'
+
+    def test_state_refreshes_after_mode_change(self, app, client, authenticated_client):
+        """Test the cached display state is dropped when the mode is changed."""
+        assert client.get('/api/display/state').get_json()['mode'] == 'waiting'
+
+        authenticated_client.post('/api/display/mode', json={'mode': 'bracket'})
+
+        assert client.get('/api/display/state').get_json()['mode'] == 'bracket'
+
+    def test_theme_served_as_cached_stylesheet(self, client):
+        """Test the state links a versioned theme stylesheet served with a long-lived ETag."""
+        data = client.get('/api/display/state').get_json()
+        assert 'theme_css' not in data
+        assert data['theme_css_url'].startswith('/theme/dark-orange.css?v=')
+
+        response = client.get(data['theme_css_url'])
+        assert response.status_code == 200
+        assert response.mimetype == 'text/css'
+        assert b'--ru-primary: #ff6b00' in response.data
+        assert response.cache_control.immutable
+
+        response = client.get(data['theme_css_url'], headers={'If-None-Match': response.get_etag()[0]})
+        assert response.status_code == 304
+
+        assert client.get('/theme/nope.css').status_code == 404
+
+    def test_theme_stylesheet_precompressed(self, client):
+        """Test the theme stylesheet is sent gzip-encoded when the client accepts it."""
+        import gzip
+
+        response = client.get('/theme/hacker.css', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert b'.matrix-rain' in gzip.decompress(response.data)
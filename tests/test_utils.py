@@ -0,0 +1,57 @@
+"""
+Tests for the input sanitizers.
+"""
+from app.utils import sanitize_text, sanitize_team_name, sanitize_player_name, sanitize_message
+
+
+def test_sanitize_text_strips_control_characters():
+    """Test control characters are removed but tabs and newlines are kept."""
+    assert sanitize_text('a\x00b\x07c\x1fd\x7fe') == 'abcde'
+    assert sanitize_text('line\none\ttab\r') == 'line\none\ttab'
+
+
+def test_sanitize_text_escapes_and_truncates():
+    """Test HTML is escaped after truncating to max_length."""
+    assert sanitize_text('<b>"hi"</b>') == '&lt;b&gt;&#34;hi&#34;&lt;/b&gt;'
+    assert sanitize_text('  abcdef  ', max_length=3) == 'abc'
+    assert sanitize_text(None) == ''
+    assert sanitize_text(42) == '42'
+
+
+def test_sanitize_names():
+    """Test team and player names keep only their allowed characters."""
+    assert sanitize_team_name('A&B  <x>') == 'A&amp;B x'
+    assert sanitize_team_name("Bo's Bots") == 'Bo&#39;s Bot'
+    assert sanitize_player_name('Jo  <Bob>!') == 'Jo Bob'
+    assert sanitize_player_name('Zoë-Ann') == 'Zoë-Ann'
+
+
+def test_sanitize_message():
+    """Test messages are trimmed, capped and escaped."""
+    assert sanitize_message('  <hi>  ') == '&lt;hi&gt;'
+    assert len(sanitize_message('x' * 600)) == 500
+
+
+def test_generate_theme_css_is_cached():
+    """Test theme CSS is rendered once per theme id."""
+    from app.utils import generate_theme_css
+    
+    generate_theme_css.cache_clear()
+    css = generate_theme_css('hacker')
+    assert generate_theme_css('hacker') is css
+    assert '.matrix-rain' in css
+    assert generate_theme_css.cache_info().hits == 1
+
+
+def test_name_whitespace_is_collapsed_and_trimmed():
+    """Test whitespace runs collapse and filtered characters don't leave trailing spaces."""
+    assert sanitize_team_name('a \t b') == 'a b'
+    assert sanitize_team_name('ab <>') == 'ab'
+    assert sanitize_player_name('Ann  {Lee}') == 'Ann Lee'
+
+
+def test_long_input_is_clipped_like_strip_then_slice():
+    """Test long input gives the same result as stripping first, then truncating."""
+    assert sanitize_team_name('   abcdefghij' + ' ' * 50) == 'abcdefgh'
+    assert sanitize_player_name('  ab' + ' ' * 40) == 'ab'
+    assert sanitize_text(' ' * 300 + 'x' * 300, max_length=5) == 'xxxxx'